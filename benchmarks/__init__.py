@@ -0,0 +1,2 @@
+# Benchmarks for the iGBot -> PLD conversion. Run from the repository root, e.g.
+#   python -m benchmarks.bench_prodef_loader --rows 20000
@@ -0,0 +1,78 @@
+# Time to first render of the Streamlit page in a fresh process: each run starts a new
+# interpreter and runs the page once with nothing uploaded through Streamlit's AppTest
+# (the same script run a new browser session triggers). Reports the Streamlit import,
+# the first script run and the heavy modules it left imported, with the background
+# warm-up (pld/warmup.py) held off so it does not race the measurement, then how long
+# the warm-up takes on its own.
+#
+#   python -m benchmarks.bench_cold_start --runs 5
+#   git show HEAD~1:igbot_to_pct.py > /tmp/old_page.py
+#   python -m benchmarks.bench_cold_start --script /tmp/old_page.py
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ("pandas", "numpy", "pyarrow", "xlsxwriter", "openpyxl", "python_calamine", "requests")
+
+# Runs in the child process; prints one JSON line
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+app = AppTest.from_file(sys.argv[1], default_timeout=300)
+app.run()
+rendered = time.perf_counter()
+heavy = [m for m in sys.argv[2].split(",") if m in sys.modules]
+warm = None
+if "pld.warmup" in sys.modules:
+    from pld import warmup
+    warmup.start("background")
+    warmup.wait()
+    warm = warmup.status["seconds"]
+print(json.dumps({
+    "streamlit": imported - start,
+    "first_render": rendered - imported,
+    "widgets": len(app.get("file_uploader")),
+    "heavy": heavy,
+    "warmup": warm,
+}))
+"""
+
+
+def run_once(script):
+    path = os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")]))
+    env = dict(os.environ, PLD_WARMUP="off", PYTHONPATH=path)
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD, script, ",".join(HEAVY)],
+        capture_output=True,
+        text=True,
+        cwd=ROOT,
+        env=env,
+        check=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Page time to first render benchmark")
+    parser.add_argument("--script", default=os.path.join(ROOT, "igbot_to_pct.py"))
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    runs = [run_once(args.script) for _ in range(args.runs)]
+    first_render = [r["first_render"] for r in runs]
+    print(f"{os.path.basename(args.script)}, {args.runs} fresh processes, {runs[0]['widgets']} uploaders rendered")
+    print(f"streamlit import   median {statistics.median(r['streamlit'] for r in runs):6.2f}s")
+    print(f"first render       median {statistics.median(first_render):6.2f}s  (min {min(first_render):.2f}s)")
+    if runs[0]["warmup"] is not None:
+        print(f"background warm-up median {statistics.median(r['warmup'] for r in runs):6.2f}s")
+    print(f"imported by the first render: {', '.join(runs[0]['heavy']) or 'none of ' + ', '.join(HEAVY)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# Cross-sheet reference check (pld/integrity.py) vs a row-by-row lookup, on a PLD built
+# from synthetic inputs with `--rows` rows per sheet. Both must find the same dangling rows.
+#
+#   python -m benchmarks.bench_integrity --rows 300000
+import argparse
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import igbot_sheets, prodef_sheets
+from pld.integrity import KEYS, check_references, integrity_frame
+from pld.loader import Sheets
+from pld.pipeline import ConversionContext, run_transforms
+from pld.sheets import TRANSFORMS
+
+POID = "RSC00001"
+
+
+def build_results(rows):
+    ctx = ConversionContext(
+        poid=POID,
+        po_name="Roaming",
+        master_keyword="ROAM",
+        workbooks={"igbot": Sheets(igbot_sheets(rows, POID)), "prodef": Sheets(prodef_sheets(rows))},
+    )
+    return run_transforms(ctx, TRANSFORMS)
+
+
+def legacy_dangling(results):
+    # Per referencing column: rows whose value is not a key, one Python lookup per row
+    counts = {}
+    for t in TRANSFORMS:
+        df = results.get(t.name)
+        if not isinstance(df, pd.DataFrame):
+            continue
+        for column, name in t.references.items():
+            key_sheet, key_column = KEYS[name]
+            keys = {str(v) for v in results[key_sheet][key_column] if pd.notna(v) and str(v).strip()}
+            counts[(t.name, column)] = sum(
+                1 for v in df[column] if pd.notna(v) and str(v).strip() and str(v) not in keys
+            )
+    return counts
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return result, min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Referential integrity check benchmark")
+    parser.add_argument("--rows", type=int, default=300_000, help="rows per synthetic sheet")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    results = build_results(args.rows)
+    checked = sum(
+        len(results[t.name]) * len(t.references) for t in TRANSFORMS if isinstance(results.get(t.name), pd.DataFrame)
+    )
+    report, new_time = best_of(lambda: check_references(TRANSFORMS, results), args.repeat)
+    counts, old_time = best_of(lambda: legacy_dangling(results), args.repeat)
+
+    frame = integrity_frame(report)
+    found = {
+        (row["sheet"], row["column"]): row["dangling rows"] for _, row in frame.iterrows() if row["references"] != "(key)"
+    }
+    assert found == counts, f"dangling rows differ:\n{found}\n{counts}"
+
+    print(frame.drop(columns="examples").to_string(index=False))
+    print(f"\n{checked:,} references checked")
+    print(f"row by row  {old_time:8.3f}s")
+    print(f"set based   {new_time:8.3f}s  speedup={old_time / new_time:5.1f}x  ({checked / new_time:,.0f} references/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# Vectorized column normalizers (pld/normalize.py) vs the row-wise expressions they replaced
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from pld.normalize import clean_str, exit_value, int_str, thousands_int, upper_str
+
+
+# The expressions igbot_to_pct.py used before pld/normalize.py
+def legacy_clean_str(s):
+    s = s.astype(str).str.strip().replace("nan", "")
+    return s.fillna("")
+
+
+def legacy_sid(s):
+    return (
+        s.astype(str)
+        .str.strip()
+        .replace(["nan", "NaN"], "")
+        .apply(lambda x: str(int(float(x))) if x.replace(".", "").isdigit() else x)
+    )
+
+
+def legacy_amount(s):
+    s = s.astype(str).str.replace(",", "", regex=False).str.split(".", n=1).str[0]
+    return pd.to_numeric(s, errors="coerce").astype("Int64")
+
+
+def legacy_initial_value(s):
+    s = s.apply(lambda x: "{:.0f}".format(float(str(x).replace(",", ""))) if pd.notna(x) else x)
+    return pd.to_numeric(s, errors="coerce").astype("Int64")
+
+
+def legacy_upper(s):
+    return s.astype(str).str.strip().str.upper()
+
+
+def legacy_exit_value(s):
+    return s.apply(lambda x: "1" if pd.notna(x) and x.strip() != "" else "")
+
+
+def columns(rows, seed=0):
+    rng = np.random.default_rng(seed)
+
+    def pick(values):
+        return pd.Series(np.asarray(values, dtype=object)[rng.integers(0, len(values), rows)])
+
+    sid = pd.Series(rng.integers(10_000_000, 99_999_999, rows).astype(float))
+    sid[rng.random(rows) < 0.1] = np.nan
+    return {
+        "Short Code": pick([" 123", "456 ", "9090", np.nan, "nan", "*123#"]),
+        "SID (float)": sid,
+        "SID (text)": pick([" 55 ", "1234.0", "AB12", np.nan, "007", "12.5"]),
+        "Amount": pick(["1,000.50", "25,000", "3.9", np.nan, "15000"]),
+        "Initial Value": pick(["1,073,741,824", 5368709120.0, 0, np.nan, "2.5"]),
+        "Flag Charge": pick(["y", " n", "Y ", np.nan]),
+        "Ruleset ShortName": pd.Series([f"RSC_PKG_{i % 50_000:06d}" for i in range(rows)], dtype=object).where(
+            rng.random(rows) > 0.05, " "
+        ),
+    }
+
+
+CASES = [
+    ("string-clean", "Short Code", legacy_clean_str, clean_str),
+    ("integer-like-string", "SID (float)", legacy_sid, int_str),
+    ("integer-like-string", "SID (text)", legacy_sid, int_str),
+    ("thousands int (truncate)", "Amount", legacy_amount, thousands_int),
+    ("thousands int (round)", "Initial Value", legacy_initial_value, lambda s: thousands_int(s, round_decimals=True)),
+    ("upper-flag", "Flag Charge", legacy_upper, upper_str),
+    ("exit value", "Ruleset ShortName", legacy_exit_value, exit_value),
+]
+
+
+def best_of(fn, s, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(s)
+        times.append(time.perf_counter() - start)
+    return result, min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Column normalizer micro-benchmark")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    data = columns(args.rows)
+    print(f"{'normalizer':<26}{'column':<20}{'legacy':>10}{'vectorized':>12}{'speedup':>9}")
+    for label, column, legacy, vectorized in CASES:
+        old, old_time = best_of(legacy, data[column], args.repeat)
+        new, new_time = best_of(vectorized, data[column], args.repeat)
+        pd.testing.assert_series_equal(old, new, check_names=False)
+        print(f"{label:<26}{column:<20}{old_time:>9.3f}s{new_time:>11.3f}s{old_time / new_time:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# Write time and output size of the PLD as an xlsx workbook (streaming writer) vs the CSV
+# and Parquet bundles (pld/bundle.py), for a PLD built from synthetic inputs with `--rows`
+# rows per sheet. Also checks that every bundle has the workbook's sheets, in order, with
+# the same columns and the same cell text.
+#
+#   python -m benchmarks.bench_output_formats --rows 100000
+import argparse
+import time
+from io import BytesIO
+
+from benchmarks.synthetic import igbot_sheets, prodef_sheets
+from pld.bundle import read_bundle
+from pld.convert import FORMATS, write_pld
+from pld.instrument import row_count
+from pld.loader import Sheets, load_sheets
+from pld.pipeline import ConversionContext, run_transforms
+from pld.sheets import TRANSFORMS
+from pld.writer import column_text
+
+POID = "RSC00001"
+
+
+def build_results(rows):
+    ctx = ConversionContext(
+        poid=POID,
+        po_name="Roaming",
+        master_keyword="ROAM",
+        workbooks={"igbot": Sheets(igbot_sheets(rows, POID)), "prodef": Sheets(prodef_sheets(rows))},
+    )
+    return run_transforms(ctx, TRANSFORMS)
+
+
+def write(results, format, repeat):
+    best = None
+    for _ in range(repeat):
+        output = BytesIO()
+        start = time.perf_counter()
+        write_pld(results, output, format=format)
+        seconds = time.perf_counter() - start
+        if best is None or seconds < best[0]:
+            best = (seconds, output.getvalue())
+    return best
+
+
+def check(workbook, bundle, format):
+    # Same sheets, columns and cell text as the workbook read back with dtype=str
+    names = [t.name for t in TRANSFORMS]
+    expected = load_sheets(workbook, names, cache=None, dtype=str, keep_default_na=False)
+    sheets = read_bundle(bundle)
+    assert list(sheets) == list(expected), f"{format}: sheets differ"
+    for name, df in expected.items():
+        assert list(sheets[name].columns) == list(df.columns), f"{format} '{name}': columns differ"
+        for col in df.columns:
+            assert (column_text(sheets[name][col]) == df[col].to_numpy()).all(), f"{format} '{name}' '{col}' differs"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PLD output format benchmark")
+    parser.add_argument("--rows", type=int, default=100_000, help="rows per synthetic sheet")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--no-check", action="store_true", help="skip reading the outputs back")
+    args = parser.parse_args()
+
+    results = build_results(args.rows)
+    rows = sum(row_count(result) or 0 for result in results.values())
+    written = {format: write(results, format, args.repeat) for format in FORMATS}
+    if not args.no_check:
+        for format in ("csv", "parquet"):
+            check(written["xlsx"][1], written[format][1], format)
+
+    xlsx_seconds, xlsx_data = written["xlsx"]
+    print(f"{rows:,} PLD rows{'' if args.no_check else ', bundles match the workbook'}")
+    print(f"{'format':<10}{'write s':>10}{'rows/s':>12}{'speedup':>9}{'size MB':>10}{'vs xlsx':>9}")
+    for format, (seconds, data) in written.items():
+        print(
+            f"{format:<10}{seconds:>10.2f}{rows / seconds:>12,.0f}{xlsx_seconds / seconds:>8.1f}x"
+            f"{len(data) / 1_048_576:>10.2f}{len(data) / len(xlsx_data):>9.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
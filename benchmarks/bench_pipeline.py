@@ -0,0 +1,147 @@
+# End-to-end and per-sheet benchmark of the iGBot -> PLD conversion at several scales.
+#
+#   python -m benchmarks.bench_pipeline --scales 1000 10000 --save
+#   python -m benchmarks.bench_pipeline --scales 1000 10000 --compare
+#
+# Each scale generates synthetic inputs with that many rows per sheet, then
+#   - times the whole conversion (parse, transforms, write) and its throughput,
+#   - times each sheet transform and sheet write from the stage instrumentation,
+#   - measures the conversion's peak traced memory in a separate tracemalloc run.
+# --save stores the results as a local baseline; --compare reports every entry that got
+# slower or bigger than the baseline by more than --tolerance and exits non-zero.
+import argparse
+import json
+import os
+import platform
+import time
+import tracemalloc
+from io import BytesIO
+
+from benchmarks.synthetic import igbot_sheets, poid_sheets, prodef_sheets, to_xlsx_bytes
+from pld.convert import WRITERS, convert, match_poid
+from pld.instrument import Instrumentation
+from pld.loader import load_sheets
+from pld.sheets import IGBOT_SHEETS, PRODEF_SHEETS
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+# Entries faster than this are too noisy to compare
+MIN_SECONDS = 0.02
+POID = "RSC00001"
+
+
+def make_inputs(rows, seed=0):
+    return {
+        "igbot": to_xlsx_bytes(igbot_sheets(rows, POID, seed=seed)),
+        "poid": poid_sheets([POID])["Sheet1"],
+        "prodef": to_xlsx_bytes(prodef_sheets(rows, seed=seed)),
+    }
+
+
+def convert_once(inputs, writer, instrumentation=None):
+    igbot = load_sheets(inputs["igbot"], IGBOT_SHEETS, cache=None)
+    prodef = load_sheets(inputs["prodef"], PRODEF_SHEETS, cache=None)
+    po = match_poid(inputs["poid"], POID)
+    output = BytesIO()
+    convert(po, igbot, prodef, output, writer=writer, instrumentation=instrumentation)
+    return sum(len(df) for df in igbot.values()) + sum(len(df) for df in prodef.values())
+
+
+def run_scale(rows, writer, repeat):
+    inputs = make_inputs(rows)
+    results = {}
+
+    best = None
+    for _ in range(repeat):
+        instrumentation = Instrumentation()
+        start = time.perf_counter()
+        rows_in = convert_once(inputs, writer, instrumentation)
+        seconds = time.perf_counter() - start
+        if best is None or seconds < best[0]:
+            best = (seconds, instrumentation)
+    seconds, instrumentation = best
+
+    tracemalloc.start()
+    convert_once(inputs, writer)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    results["end_to_end"] = {
+        "seconds": round(seconds, 4),
+        "rows": rows_in,
+        "rows_per_s": round(rows_in / seconds),
+        "peak_mb": round(peak / 1_048_576, 1),
+    }
+    for record in instrumentation.stages:
+        if record["stage"] not in ("transform", "write") or not record["rows_out"]:
+            continue
+        results[f"{record['stage']}:{record['sheet']}"] = {
+            "seconds": record["seconds"],
+            "rows": record["rows_out"],
+            "rows_per_s": round(record["rows_out"] / record["seconds"]) if record["seconds"] else None,
+        }
+    return results
+
+
+def compare(current, baseline, tolerance):
+    regressions = []
+    for scale, entries in current.items():
+        for name, now in entries.items():
+            before = baseline.get(scale, {}).get(name)
+            if not before:
+                continue
+            if before["seconds"] >= MIN_SECONDS and now["seconds"] > before["seconds"] * (1 + tolerance):
+                regressions.append(f"{scale} rows {name}: {before['seconds']:.3f}s -> {now['seconds']:.3f}s")
+            if "peak_mb" in before and now["peak_mb"] > before["peak_mb"] * (1 + tolerance):
+                regressions.append(f"{scale} rows {name}: peak {before['peak_mb']} MB -> {now['peak_mb']} MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="iGBot -> PLD conversion benchmark")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1000, 10000, 50000], help="rows per sheet")
+    parser.add_argument("--writer", choices=WRITERS, default="streaming")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="store the results as the baseline")
+    parser.add_argument("--compare", action="store_true", help="compare against the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown/growth (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    current = {}
+    for rows in args.scales:
+        results = run_scale(rows, args.writer, args.repeat)
+        current[str(rows)] = results
+        e2e = results["end_to_end"]
+        print(
+            f"{rows:>8} rows/sheet  {e2e['seconds']:8.2f}s  {e2e['rows_per_s']:>9} rows/s  "
+            f"peak {e2e['peak_mb']:7.1f} MB"
+        )
+        slowest = sorted((k for k in results if k != "end_to_end"), key=lambda k: -results[k]["seconds"])[:5]
+        for name in slowest:
+            r = results[name]
+            print(f"{'':>10}{name:<36}{r['seconds']:8.3f}s  {r['rows_per_s'] or 0:>9} rows/s")
+
+    status = 0
+    if args.compare:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(current, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if not regressions:
+            print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+        status = 1 if regressions else 0
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump(
+                {"writer": args.writer, "python": platform.python_version(), "machine": platform.node(), "results": current},
+                f,
+                indent=2,
+            )
+        print(f"Baseline saved to {args.baseline}")
+    return status
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
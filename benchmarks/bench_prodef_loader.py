@@ -0,0 +1,68 @@
+# Prodef DMP loading: six separate pd.read_excel calls vs one load_sheets pass
+import argparse
+import time
+from io import BytesIO
+
+import openpyxl
+import pandas as pd
+
+from benchmarks.synthetic import prodef_sheets, to_xlsx_bytes
+from pld.loader import load_sheets
+from pld.sheets import PRODEF_SHEETS
+
+
+class count_workbook_opens:
+    # Count openpyxl.load_workbook calls (one per zip open / shared-strings parse)
+    def __enter__(self):
+        self.count = 0
+        self._orig = openpyxl.load_workbook
+
+        def counted(*args, **kwargs):
+            self.count += 1
+            return self._orig(*args, **kwargs)
+
+        openpyxl.load_workbook = counted
+        return self
+
+    def __exit__(self, *exc):
+        openpyxl.load_workbook = self._orig
+
+
+def per_sheet_reads(data):
+    return {name: pd.read_excel(BytesIO(data), engine="openpyxl", sheet_name=name) for name in PRODEF_SHEETS}
+
+
+def single_pass(data):
+    return load_sheets(data, PRODEF_SHEETS, cache=None, engine="openpyxl")
+
+
+def run(label, fn, data, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        with count_workbook_opens() as opens:
+            start = time.perf_counter()
+            result = fn(data)
+            best = min(best, time.perf_counter() - start)
+    print(f"{label:<22} opens={opens.count:<3} best={best:8.3f}s")
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prodef DMP single-pass loader benchmark")
+    parser.add_argument("--rows", type=int, default=20_000, help="rows per Prodef sheet")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    data = to_xlsx_bytes(prodef_sheets(args.rows))
+    print(f"Prodef DMP: {args.rows} rows/sheet, {len(data) / 1_048_576:.1f} MB")
+
+    old, old_time = run("pd.read_excel x6", per_sheet_reads, data, args.repeat)
+    new, new_time = run("load_sheets (1 pass)", single_pass, data, args.repeat)
+
+    for name in PRODEF_SHEETS:
+        pd.testing.assert_frame_equal(old[name], new[name])
+    print(f"speedup: {old_time / new_time:.2f}x, identical DataFrames")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# Memory of the loaded input sheets with and without the per-sheet read specs
+# (pld/schema.py: compact dtypes at read time, column pruning), on a synthetic iGBot file
+# and Prodef DMP with `--rows` rows per sheet: the parsed frames, the PLD sheets built
+# from them, and the peak traced memory of parse + transforms. Also checks that both
+# loads give the PLD sheets the same cells, and the same errors for a fractional OpIndex
+# (the Rules-Cases sheets are reported and left out, nothing raises while loading).
+#
+#   python -m benchmarks.bench_read_specs --rows 50000
+import argparse
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.synthetic import igbot_sheets, prodef_sheets, to_xlsx_bytes
+from pld.loader import load_sheets
+from pld.pipeline import ConversionContext, run_transforms
+from pld.schema import read_specs
+from pld.sheets import IGBOT_SHEETS, PRODEF_SHEETS, TRANSFORMS
+from pld.writer import column_values
+
+POID = "RSC00001"
+
+
+def load(inputs, specs):
+    igbot = load_sheets(inputs["igbot"], IGBOT_SHEETS, cache=None, specs=read_specs("igbot") if specs else None)
+    prodef = load_sheets(inputs["prodef"], PRODEF_SHEETS, cache=None, specs=read_specs("prodef") if specs else None)
+    return igbot, prodef
+
+
+def transform(igbot, prodef, ctx=None):
+    ctx = ctx or ConversionContext(
+        poid=POID, po_name="Roaming", master_keyword="ROAM", workbooks={"igbot": igbot, "prodef": prodef}
+    )
+    return run_transforms(ctx, TRANSFORMS, max_workers=1)
+
+
+def fractional_opindex(rows):
+    # A 2.5 in row 5 of both Rules-Cases sheets: (PLD cells, error messages) of each load
+    sheets = igbot_sheets(rows, POID)
+    for name in ("Rules-Cases-Condition", "Rules-Cases-Success"):
+        sheets[name].loc[4, "OpIndex"] = 2.5
+    inputs = {"igbot": to_xlsx_bytes(sheets), "prodef": to_xlsx_bytes(prodef_sheets(rows))}
+    outcome = {}
+    for label, specs in (("plain", False), ("read specs", True)):
+        igbot, prodef = load(inputs, specs)
+        ctx = ConversionContext(
+            poid=POID, po_name="Roaming", master_keyword="ROAM", workbooks={"igbot": igbot, "prodef": prodef}
+        )
+        results = transform(igbot, prodef, ctx)
+        outcome[label] = (cells(results), [m for level, m in ctx.messages if level == "error"])
+    return outcome
+
+
+def frame_bytes(frames):
+    return sum(
+        int(df.memory_usage(index=True, deep=True).sum()) for df in frames.values() if isinstance(df, pd.DataFrame)
+    )
+
+
+def cells(results):
+    # What the writer would store for every PLD sheet
+    return {
+        name: (list(df.columns), [column_values(df.iloc[:, i]) for i in range(df.shape[1])])
+        for name, df in results.items()
+        if isinstance(df, pd.DataFrame)
+    }
+
+
+def measure(inputs, specs):
+    start = time.perf_counter()
+    igbot, prodef = load(inputs, specs)
+    load_time = time.perf_counter() - start
+    loaded = {"igbot": frame_bytes(igbot), "prodef": frame_bytes(prodef)}
+
+    start = time.perf_counter()
+    results = transform(igbot, prodef)
+    transform_time = time.perf_counter() - start
+    return {
+        "load": load_time,
+        "transform": transform_time,
+        **loaded,
+        "results": frame_bytes(results),
+        "cells": cells(results),
+    }
+
+
+def peak(inputs, specs):
+    # Peak traced memory of parse + transforms, in its own run so tracing does not skew timings
+    tracemalloc.start()
+    transform(*load(inputs, specs))
+    peak_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read spec memory benchmark")
+    parser.add_argument("--rows", type=int, default=50_000, help="rows per synthetic sheet")
+    args = parser.parse_args()
+
+    inputs = {
+        "igbot": to_xlsx_bytes(igbot_sheets(args.rows, POID)),
+        "prodef": to_xlsx_bytes(prodef_sheets(args.rows)),
+    }
+    runs = {}
+    for label, specs in (("plain", False), ("read specs", True)):
+        runs[label] = measure(inputs, specs)
+        runs[label]["peak"] = peak(inputs, specs)
+
+    plain, compact = runs["plain"], runs["read specs"]
+    assert plain["cells"] == compact["cells"], "read specs changed the PLD cells"
+    fractional = fractional_opindex(min(args.rows, 1000))
+    assert fractional["plain"] == fractional["read specs"], "read specs changed a fractional OpIndex outcome"
+    errors = fractional["read specs"][1]
+    assert any("Rules-Cases-Condition" in m for m in errors), errors
+
+    mb = 1024 * 1024
+    print(f"{args.rows:,} rows per sheet, identical PLD from both loads")
+    print(f"fractional OpIndex: same PLD and errors from both loads ({len(errors)} sheets reported)")
+    print(f"{'':<22}{'plain':>12}{'read specs':>12}{'change':>9}")
+    for key, label in (
+        ("igbot", "iGBot frames MB"),
+        ("prodef", "Prodef frames MB"),
+        ("results", "PLD sheets MB"),
+        ("peak", "peak traced MB"),
+    ):
+        print(f"{label:<22}{plain[key] / mb:>12.1f}{compact[key] / mb:>12.1f}{compact[key] / plain[key] - 1:>9.0%}")
+    for key, label in (("load", "load s"), ("transform", "transforms s")):
+        print(f"{label:<22}{plain[key]:>12.2f}{compact[key]:>12.2f}{compact[key] / plain[key] - 1:>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
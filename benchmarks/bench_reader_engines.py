@@ -0,0 +1,109 @@
+# Excel reader engines: parse time of the iGBot and Prodef DMP workbooks per engine, plus a
+# parity check that every PLD sheet built from each engine's DataFrames (i.e. after the
+# column normalizations) is identical to the openpyxl one, values and dtypes.
+#
+#   python -m benchmarks.bench_reader_engines --rows 20000
+#   python -m benchmarks.bench_reader_engines --igbot iGBot-Result-Roaming-RSC002.xlsx \
+#       --prodef Prodef_DMP.xlsx --poid-file Roaming_SC_Completion_v1.xlsx
+import argparse
+import os
+import time
+from io import BytesIO
+
+import pandas as pd
+
+from benchmarks.synthetic import igbot_sheets, poid_sheets, prodef_sheets, to_xlsx_bytes
+from pld.convert import convert, extract_poid, match_poid
+from pld.loader import available_engines, load_sheets, read_sheet
+from pld.sheets import IGBOT_SHEETS, PRODEF_SHEETS
+from pld.writer import SheetTemplate
+
+POID = "RSC00001"
+
+
+def synthetic_inputs(rows):
+    return {
+        "igbot": to_xlsx_bytes(igbot_sheets(rows, POID)),
+        "prodef": to_xlsx_bytes(prodef_sheets(rows)),
+        "poid": to_xlsx_bytes(poid_sheets([POID])),
+        "poid_id": POID,
+    }
+
+
+def file_inputs(igbot, prodef, poid_file):
+    inputs = {"poid_id": extract_poid(os.path.basename(igbot))}
+    for key, path in (("igbot", igbot), ("prodef", prodef), ("poid", poid_file)):
+        with open(path, "rb") as f:
+            inputs[key] = f.read()
+    return inputs
+
+
+def parse(inputs, engine):
+    start = time.perf_counter()
+    igbot = load_sheets(inputs["igbot"], IGBOT_SHEETS, cache=None, engine=engine)
+    prodef = load_sheets(inputs["prodef"], PRODEF_SHEETS, cache=None, engine=engine)
+    poid_df = read_sheet(inputs["poid"], "Sheet1", cache=None, engine=engine)
+    return igbot, prodef, poid_df, time.perf_counter() - start
+
+
+def build(inputs, engine):
+    igbot, prodef, poid_df, seconds = parse(inputs, engine)
+    po = match_poid(poid_df, inputs["poid_id"])
+    if po is None:
+        raise SystemExit(f"POID {inputs['poid_id']} not found in the POID matching file")
+    ctx = convert(po, igbot, prodef, BytesIO(), max_workers=1)
+    fallbacks = sorted(name for name, used in {**igbot.engines, **prodef.engines}.items() if used != engine)
+    return ctx.results, seconds, fallbacks
+
+
+def assert_same_sheets(expected, actual, engine):
+    assert expected.keys() == actual.keys(), f"{engine}: different sheets built"
+    for name, want in expected.items():
+        got = actual[name]
+        if isinstance(want, SheetTemplate):
+            assert (want.columns, want.rows) == (got.columns, got.rows), f"{engine}: {name} differs"
+            continue
+        try:
+            pd.testing.assert_frame_equal(want, got)
+        except AssertionError as e:
+            raise AssertionError(f"{engine}: sheet {name} differs from openpyxl\n{e}") from None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Excel reader engine benchmark and parity check")
+    parser.add_argument("--rows", type=int, default=20_000, help="rows per synthetic sheet")
+    parser.add_argument("--igbot", help="real iGBot result file instead of synthetic inputs")
+    parser.add_argument("--prodef", help="Prodef DMP file (with --igbot)")
+    parser.add_argument("--poid-file", help="POID matching file (with --igbot)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.igbot:
+        if not (args.prodef and args.poid_file):
+            parser.error("--igbot needs --prodef and --poid-file")
+        inputs = file_inputs(args.igbot, args.prodef, args.poid_file)
+    else:
+        inputs = synthetic_inputs(args.rows)
+    size = sum(len(inputs[key]) for key in ("igbot", "prodef", "poid"))
+    print(f"inputs: {size / 1_048_576:.1f} MB, engines available: {', '.join(available_engines())}")
+
+    reference = None
+    reference_time = None
+    for engine in ("openpyxl", *[e for e in available_engines() if e != "openpyxl"]):
+        best = min(parse(inputs, engine)[-1] for _ in range(args.repeat))
+        results, _, fallbacks = build(inputs, engine)
+        if reference is None:
+            reference, reference_time = results, best
+            parity = "reference"
+        else:
+            assert_same_sheets(reference, results, engine)
+            parity = "identical PLD sheets"
+        note = f", fell back to openpyxl for: {', '.join(fallbacks)}" if fallbacks else ""
+        print(f"{engine:<10} parse best={best:8.3f}s  speedup={reference_time / best:5.2f}x  {parity}{note}")
+
+    if len(available_engines()) == 1:
+        print("install python-calamine to compare the calamine engine")
+
+
+if __name__ == "__main__":
+    main()
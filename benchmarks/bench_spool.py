@@ -0,0 +1,93 @@
+# Peak memory of writing a large PLD and serving its download from a BytesIO (what the
+# page kept before) vs a SpooledOutput (pld/spool.py). Measured with tracemalloc, for:
+#   write    writing the PLD
+#   held     what stays in memory between reruns until the download is clicked
+#   download writing it and reading it for Streamlit (getvalue(); for the spool that is
+#            the deferred read the download button makes on click)
+# A real PLD of --mb megabytes takes many minutes to build, so the PLD written here is a
+# zip of --mb MB of incompressible members written in 1 MiB chunks, which is what the
+# output sees of xlsxwriter assembling the workbook. Also checks that a real PLD from
+# synthetic inputs (--rows rows per sheet) comes out the same through a spool (every zip
+# member byte for byte, except the workbook's creation time).
+#
+#   python -m benchmarks.bench_spool --mb 100
+import argparse
+import os
+import time
+import tracemalloc
+import zipfile
+from io import BytesIO
+
+from benchmarks.bench_output_formats import build_results
+from pld.convert import write_pld
+from pld.spool import SpooledOutput
+
+MB = 1024 * 1024
+CHUNK = os.urandom(MB)
+
+
+def write_zip(output, mb):
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_STORED) as archive:
+        for member in range(0, mb, 10):
+            with archive.open(f"xl/worksheets/sheet{member // 10 + 1}.xml", "w") as f:
+                for _ in range(min(10, mb - member)):
+                    f.write(CHUNK)
+
+
+def members(data):
+    with zipfile.ZipFile(BytesIO(data)) as archive:
+        return {name: archive.read(name) for name in archive.namelist() if name != "docProps/core.xml"}
+
+
+def measure(make_output, serve, mb):
+    tracemalloc.start()
+    start = time.perf_counter()
+    output = make_output()
+    write_zip(output, mb)
+    _, write_peak = tracemalloc.get_traced_memory()
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    data = serve(output)
+    _, serve_peak = tracemalloc.get_traced_memory()
+    seconds = time.perf_counter() - start
+    tracemalloc.stop()
+    size = len(data)
+    del data
+    return {
+        "write": write_peak,
+        "held": held,
+        "download": max(write_peak, serve_peak),
+        "size": size,
+        "seconds": seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Spooled PLD output memory benchmark")
+    parser.add_argument("--mb", type=int, default=100)
+    parser.add_argument("--rows", type=int, default=2000)
+    args = parser.parse_args()
+
+    results = build_results(args.rows)
+    for format in ("xlsx", "csv", "parquet"):
+        memory, spool = BytesIO(), SpooledOutput(threshold=64 * 1024)
+        write_pld(results, memory, format=format)
+        write_pld(results, spool, format=format)
+        same = members(memory.getvalue()) == members(spool.getvalue())
+        print(f"{format:8} {args.rows} rows: {spool.size / MB:.1f} MB, spooled: {spool.rolled}, identical: {same}")
+        assert same
+
+    runs = {
+        "BytesIO": measure(BytesIO, BytesIO.getvalue, args.mb),
+        "SpooledOutput": measure(SpooledOutput, SpooledOutput.getvalue, args.mb),
+    }
+    size = runs["BytesIO"]["size"]
+    print(f"\nPLD of {size / MB:.0f} MB, traced peak memory (x the PLD size):")
+    print(f"{'output':14} {'write':>14} {'held':>14} {'download':>14} {'seconds':>8}")
+    for name, run in runs.items():
+        cells = " ".join(f"{run[k] / MB:7.1f} MB {run[k] / size:4.2f}x" for k in ("write", "held", "download"))
+        print(f"{name:14} {cells} {run['seconds']:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+# Synthetic input workbooks for the benchmarks: iGBot result files, POID matching files
+# and Prodef DMP files with every sheet and column the conversion reads.
+#
+#   python -m benchmarks.synthetic --out-dir synthetic --rows 10000 --poids 3
+#
+# `rows` is either one row count for every sheet or a {sheet name: rows} dict; sheets
+# missing from the dict get DEFAULT_ROWS. The same seed always gives the same files.
+import argparse
+import os
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_ROWS = 1000
+
+
+def _pick(rng, values, n):
+    return np.asarray(values, dtype=object)[rng.integers(0, len(values), n)]
+
+
+def _blank(rng, values, share=0.1):
+    # Replace a share of the values with NaN, as empty cells read back from Excel
+    values = pd.Series(values, dtype=object)
+    return values.mask(rng.random(len(values)) < share).to_numpy()
+
+
+def _rows(rows, sheet_name):
+    return rows.get(sheet_name, DEFAULT_ROWS) if isinstance(rows, dict) else rows
+
+
+def _shortnames(poid, n):
+    return np.array([f"{poid}_RS_{i:06d}" for i in range(n)], dtype=object)
+
+
+def igbot_file_name(poid, prefix="iGBot-Result-Roaming"):
+    # extract_poid() takes the fourth "-" separated part of the name
+    return f"{prefix}-{poid}.xlsx"
+
+
+def poid_list(count, start=1):
+    return [f"RSC{i:05d}" for i in range(start, start + count)]
+
+
+def igbot_sheets(rows, poid="RSC00001", seed=0):
+    rng = np.random.default_rng(seed)
+    sheets = {}
+
+    n = _rows(rows, "Rules-Keyword")
+    sheets["Rules-Keyword"] = pd.DataFrame(
+        {
+            "Keyword": [f"ROAM{i}" for i in range(n)],
+            "Ruleset ShortName": _shortnames(poid, n),
+            "Short Code": _blank(rng, _pick(rng, [122, " 363", "888 ", "*123#"], n)),
+        }
+    )
+
+    n = _rows(rows, "Rules-Alias")
+    sheets["Rules-Alias"] = pd.DataFrame(
+        {
+            "Alias": [f"RM{i}" for i in range(n)],
+            "Keyword": [f"ROAM{i}" for i in range(n)],
+            "Short Code": _blank(rng, _pick(rng, [122, 363], n)),
+        }
+    )
+
+    n = _rows(rows, "Rules-Header")
+    sheets["Rules-Header"] = pd.DataFrame(
+        {
+            "Ruleset ShortName": _shortnames(poid, n),
+            "Keyword": _pick(rng, ["AKTIF", "INFO", "STOP"], n),
+            "Ruleset Version": _blank(rng, rng.integers(1, 5, n)),
+            "Description": "Roaming single country",
+        }
+    )
+
+    n = _rows(rows, "PCRF")
+    sheets["PCRF"] = pd.DataFrame(
+        {
+            "Ruleset ShortName": [s + " " for s in _shortnames(poid, n)],
+            "PCRF Profile": _pick(rng, ["ROAM_1GB", "ROAM_UNL"], n),
+            "LifeTime Validity": _blank(rng, rng.integers(1, 31, n)),
+            "MaxLife Time": _blank(rng, rng.integers(30, 91, n)),
+        }
+    )
+
+    n = _rows(rows, "Rules-Cases-Condition")
+    sheets["Rules-Cases-Condition"] = pd.DataFrame(
+        {
+            "Ruleset ShortName": _shortnames(poid, n),
+            "OpIndex": _blank(rng, rng.integers(1, 10, n).astype(float)),
+            "Condition": _pick(rng, ["BALANCE>=PRICE", "PROFILE=PREPAID"], n),
+            "Keyword Type": "",
+        }
+    )
+
+    n = _rows(rows, "Rules-Cases-Success")
+    sheets["Rules-Cases-Success"] = pd.DataFrame(
+        {
+            "Ruleset ShortName": _blank(rng, _shortnames(poid, n)),
+            "OpIndex": _blank(rng, rng.integers(1, 10, n).astype(float)),
+            "Exit Value": "",
+        }
+    )
+
+    n = _rows(rows, "Rules-Price-Mapping")
+    sheets["Rules-Price-Mapping"] = pd.DataFrame(
+        {
+            "PO ID": poid,
+            "SID": _blank(rng, _pick(rng, [10011001.0, " 20022002 ", "3003.0", "SID_X"], n)),
+            "Variable Name": _pick(rng, ["Price", "PRICE_PROMO"], n),
+            "Resultant Shortname": _shortnames(poid, n),
+        }
+    )
+
+    n = _rows(rows, "Rules-Renewal")
+    sheets["Rules-Renewal"] = pd.DataFrame(
+        {
+            "Ruleset ShortName": _shortnames(poid, n),
+            "Max Cycle": _blank(rng, rng.integers(1, 13, n)),
+            "Period": _blank(rng, rng.integers(1, 31, n)),
+            "Amount": _blank(rng, _pick(rng, ["150,000", "75,000.00", 25000, "99,000.50"], n)),
+            "Reg Subaction": _blank(rng, _pick(rng, ["RENEW ", "STOP"], n)),
+            "Flag Charge": _pick(rng, ["y", " n", "Y"], n),
+            "Flag Suspend": _pick(rng, ["y", "n"], n),
+            "Flag Option": _pick(rng, ["y", "n "], n),
+        }
+    )
+
+    n = _rows(rows, "Library-Addon-Name")
+    sheets["Library-Addon-Name"] = pd.DataFrame(
+        {
+            "Ruleset ShortName": _shortnames(poid, n),
+            "Addon Name": [f"Roaming {i} GB" for i in range(n)],
+            "Master Shortcode": _blank(rng, _pick(rng, [122, 363], n)),
+            "Active Period Length": _blank(rng, rng.integers(1, 31, n)),
+            "Grace Period": _blank(rng, rng.integers(0, 8, n)),
+        }
+    )
+    return sheets
+
+
+def prodef_sheets(rows, seed=0, extra_sheets=4):
+    rng = np.random.default_rng(seed)
+    sheets = {}
+
+    n = _rows(rows, "Rules-Messages")
+    sheets["Rules-Messages"] = pd.DataFrame(
+        {
+            "Ruleset ShortName": [" " + s for s in _shortnames("PRODEF", n)],
+            "Message Type": _pick(rng, ["SUCCESS", "FAILED", "REMINDER"], n),
+            "Language": _pick(rng, ["ID", "EN"], n),
+            "Message": [f"Paket roaming {i} aktif s/d [EXPIRY_DATE]" for i in range(n)],
+        }
+    )
+
+    n = _rows(rows, "Rules-Price")
+    sheets["Rules-Price"] = pd.DataFrame(
+        {
+            "SID": rng.integers(10_000_000, 99_999_999, n),
+            "Variable Name": _pick(rng, ["Dormant", "price", "PRICE_PROMO"], n),
+            "Resultant Shortname": _shortnames("PRODEF", n),
+        }
+    )
+
+    n = _rows(rows, "Rebuy-Association")
+    sheets["Rebuy-Association"] = pd.DataFrame(
+        {
+            "Target PO ID": "sample",
+            "Service Type": "",
+            "Rebuy Option": _blank(rng, _pick(rng, [" ALLOW", "DENY "], n)),
+            "Source Ruleset ShortName": [s.lower() + " " for s in _shortnames("PRODEF", n)],
+            "Source MPP": _blank(rng, _pick(rng, ["mpp_roam", "mpp_basic"], n)),
+            "Action": "INSERT",
+        }
+    )
+
+    n = _rows(rows, "Library-Addon-DA")
+    sheets["Library-Addon-DA"] = pd.DataFrame(
+        {
+            "Ruleset ShortName": _shortnames("PRODEF", n),
+            "DA ID": rng.integers(1, 5000, n),
+            "Initial Value": _blank(rng, _pick(rng, ["1,073,741,824", 5368709120.0, 0], n)),
+            "Validity": rng.integers(1, 31, n),
+        }
+    )
+
+    n = _rows(rows, "Standalone")
+    sheets["Standalone"] = pd.DataFrame(
+        {
+            "Ruleset ShortName": [s + " " for s in _shortnames("PRODEF", n)],
+            "ID": rng.integers(1, 10_000, n),
+            "Value": rng.integers(1, 100, n),
+            "UOM": _pick(rng, ["GB", "MB", "MIN"], n),
+            "Validity": rng.integers(1, 31, n),
+        }
+    )
+
+    n = _rows(rows, "UMB-Push-Category")
+    sheets["UMB-Push-Category"] = pd.DataFrame(
+        {
+            "Ruleset ShortName": _shortnames("PRODEF", n),
+            "Category": _pick(rng, ["ROAMING", "INTERNET"], n),
+        }
+    )
+
+    # Real Prodef DMP files carry many sheets the conversion never reads
+    n = _rows(rows, "Other")
+    for i in range(extra_sheets):
+        sheets[f"Other-{i}"] = pd.DataFrame(
+            {"Key": _shortnames("OTHER", n), "Value": rng.integers(0, 1_000_000, n), "Note": "unused"}
+        )
+    return sheets
+
+
+def poid_sheets(poids):
+    return {
+        "Sheet1": pd.DataFrame(
+            {
+                "POID": poids,
+                "POName": [f"Roaming Single Country {p}" for p in poids],
+                "Keyword": [f"ROAM{p[-3:]}" for p in poids],
+            }
+        )
+    }
+
+
+def to_xlsx_bytes(sheets):
+    buf = BytesIO()
+    with pd.ExcelWriter(buf, engine="xlsxwriter") as writer:
+        for name, df in sheets.items():
+            df.to_excel(writer, sheet_name=name, index=False)
+    return buf.getvalue()
+
+
+def write_inputs(out_dir, rows, poids=1, seed=0):
+    # One iGBot file per POID plus the shared POID matching and Prodef DMP files
+    os.makedirs(out_dir, exist_ok=True)
+    poids = poid_list(poids) if isinstance(poids, int) else list(poids)
+    paths = {"igbot": []}
+    for i, poid in enumerate(poids):
+        path = os.path.join(out_dir, igbot_file_name(poid))
+        with open(path, "wb") as f:
+            f.write(to_xlsx_bytes(igbot_sheets(rows, poid, seed=seed + i)))
+        paths["igbot"].append(path)
+    paths["poid"] = os.path.join(out_dir, "Roaming_SC_Completion_v1.xlsx")
+    with open(paths["poid"], "wb") as f:
+        f.write(to_xlsx_bytes(poid_sheets(poids)))
+    paths["prodef"] = os.path.join(out_dir, "Prodef_DMP.xlsx")
+    with open(paths["prodef"], "wb") as f:
+        f.write(to_xlsx_bytes(prodef_sheets(rows, seed=seed)))
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic iGBot, POID matching and Prodef DMP files")
+    parser.add_argument("--out-dir", default="synthetic")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS, help="rows per sheet")
+    parser.add_argument("--poids", type=int, default=1, help="number of iGBot files / POIDs")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    paths = write_inputs(args.out_dir, args.rows, args.poids, args.seed)
+    for path in [*paths["igbot"], paths["poid"], paths["prodef"]]:
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
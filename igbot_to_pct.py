@@ -1,39 +1,68 @@
-import re
-import pandas as pd
 import streamlit as st
-from io import BytesIO
 import threading
-import time
-import requests
-import numpy as np
-from openpyxl import Workbook
+from pld import warmup
+import cProfile
+import os
+import zipfile
+from collections import Counter
 
 # Initialize default output and file name
-output = BytesIO()
+workbook_data = b""  # The PLD download: a deferred read of its spool once built
 output_file_name = "default_output.xlsx"  # Default value to avoid NameError
-
-def keep_awake():
-    while True:
-        try:
-            requests.get("https://sp-area-details-dmp.streamlit.app")  
-        except Exception as e:
-            print("Keep-awake request failed:", e)
-        time.sleep(600)  
-
-threading.Thread(target=keep_awake, daemon=True).start()
+output_format = "xlsx"
+changes_data = None  # Changes-only PLD, when a previous PLD was uploaded
+changes = {}
+build_stages = []  # Stages of the conversion that produced the workbook (may be cached)
+profile_data = None
+profile_text = ""
 
 st.title("iGBot Output to PLD Files")
 
-input_file = st.file_uploader("Upload the iGBot Result file", type=["xlsx"])
+input_files = st.file_uploader("Upload the iGBot Result file(s)", type=["xlsx"], accept_multiple_files=True)
+# One file goes through the page below; several are converted together into one zip
+input_file = input_files[0] if len(input_files) == 1 else None
 file2 = st.file_uploader("Upload the POID matching file (Roaming_SC_Completion_v1.xlsx)", type=["xlsx"])
 file3 = st.file_uploader("Upload the Prodef DMP file", type=["xlsx"])
+file4 = st.file_uploader(
+    "Upload the previous PLD for this POID (optional, to also get a changes-only PLD)", type=["xlsx"]
+)
 
-def extract_poid(filename):
-    filename = filename.replace(".xlsx", "")  
-    parts = filename.split("-")
-    if len(parts) < 4:
-        return None  
-    return parts[3].strip()  
+# The uploaders are on screen with only Streamlit imported. pandas, the Excel engines and
+# the pld modules load on a background thread of this process meanwhile (PLD_WARMUP, see
+# pld/warmup.py), and are only imported here once something is uploaded
+warmup.start()
+if not (input_files or file2 or file3 or file4):
+    st.stop()
+
+import pandas as pd
+from pld.batch import iter_batch
+from pld.cache import content_digest, parse_cache, workbook_cache
+from pld.loader import Sheets, load_sheets, resolve_engine
+from pld.admission import estimate_bytes, scheduler
+from pld.convert import FORMATS, changes_file_name, convert, expected_stages, extract_poid, pld_file_name
+from pld.diff import changes_frame, read_previous
+from pld.integrity import integrity_frame
+from pld.refstore import current_reference, import_reference
+from pld.schema import SchemaError, check, read_headers, read_specs
+from pld.sheets import IGBOT_SHEETS
+from pld.spool import ScratchDir, SpooledOutput
+from pld.instrument import Instrumentation, Progress, enable_json_logging, profile_bytes, profile_summary, stages_frame
+
+# Stage timings of this rerun, also logged as JSON lines on stderr
+enable_json_logging()
+instrumentation = Instrumentation()
+
+# Same sheets and columns in every format; the bundles are for programmatic consumers
+output_format = st.radio(
+    "Output format",
+    list(FORMATS),
+    format_func={
+        "xlsx": "Excel workbook (.xlsx)",
+        "csv": "CSV per sheet (.csv.zip)",
+        "parquet": "Parquet per sheet (.parquet.zip)",
+    }.get,
+    horizontal=True,
+)
 
 if input_file:
     input_file_name = input_file.name
@@ -45,24 +74,47 @@ if input_file:
         st.error("Invalid input file name format. Unable to extract POID.")
         st.stop()
 
-if file2:
-    try:
-        poid_df = pd.read_excel(file2, engine="openpyxl", sheet_name="Sheet1")
-        required_columns = {"POID", "POName", "Keyword"}
-        if not required_columns.issubset(poid_df.columns):
-            st.error(f"File2 is missing required columns: {required_columns}")
-            st.stop()
-    except Exception as e:
-        st.error(f"Error reading POID matching file: {e}")
-
-    matched_row = poid_df[poid_df["POID"] == extracted_poid]
-    if matched_row.empty:
+# Reference data: an uploaded POID matching / Prodef DMP file is imported into the local
+# reference store (a no-op when that exact file is already stored) and used; without an
+# upload the last imported version is used
+poid_ref = None
+prodef_ref = None
+try:
+    if file2:
+        with instrumentation.stage("parse", sheet="POID file") as record:
+            poid_ref = import_reference("poid", file2, source=file2.name)
+            record["rows_out"] = len(poid_ref.poid_index())
+            record["engine"] = resolve_engine()
+    else:
+        poid_ref = current_reference("poid")
+except Exception as e:
+    st.error(f"Error reading POID matching file: {e}")
+    st.stop()
+try:
+    if file3:
+        with instrumentation.stage("parse", sheet="Prodef DMP file (import)"):
+            prodef_ref = import_reference("prodef", file3, source=file3.name)
+    else:
+        prodef_ref = current_reference("prodef")
+except Exception as e:
+    st.error(f"Error reading Prodef DMP file: {e}")
+    st.stop()
+
+if input_file and poid_ref:
+    if not file2:
+        st.info(f"Using the stored POID matching file {poid_ref.describe()}")
+    if prodef_ref and not file3:
+        st.info(f"Using the stored Prodef DMP file {prodef_ref.describe()}")
+
+    # Index lookup on the stored POID index instead of scanning the sheet
+    with instrumentation.stage("poid_match", rows_in=len(poid_ref.poid_index())) as record:
+        po = poid_ref.match_poid(extracted_poid)
+        record["rows_out"] = 0 if po is None else 1
+    if po is None:
         st.error(f"No matching POID found for '{extracted_poid}' in file2.")
         st.stop()
 
-    final_poid = matched_row["POID"].iloc[0]
-    po_name = matched_row["POName"].iloc[0]
-    master_keyword = matched_row["Keyword"].iloc[0]
+    final_poid, po_name, master_keyword = po
 
     ID = st.text_input("Enter the PLD ID:")
     if not ID:
@@ -70,478 +122,359 @@ if file2:
         st.stop()
 
     # Ensure `output_file_name` is always defined
-    output_file_name = f"PLD_{ID}_{final_poid}.xlsx"
-    file1 = pd.ExcelFile(input_file)
-
-    writer = pd.ExcelWriter(output, engine="xlsxwriter")
-
-    # Create DataFrame for the "PO" sheet with predefined and matched values
-    po_df = pd.DataFrame(
-        {
-            "PO ID": [final_poid],  # Matched POID from file2
-            "PO Name": [po_name],  # Retrieved from file2
-            "Master Keyword": [master_keyword],  # Retrieved from file2
-            "Family": ["roamingSingleCountry"],  # Predefined value
-            "PO Type": ["ADDON"],  # Predefined value
-            "Product Category": ["b2cMobile"],  # Predefined value
-            "Payment Type": ["Prepaid,Postpaid"],  # Predefined value
-            "Action": ["NO_CHANGE"],  # Predefined value
-        }
+    output_file_name = pld_file_name(ID, final_poid, output_format)
+    # The finished workbook only depends on the uploads (and the iGBot file name, which
+    # carries the POID), the PLD ID and the output format, so reruns for any other widget
+    # reuse it (reference versions are the digests of the xlsx files they were imported from)
+    igbot_digest = content_digest(input_file)
+    prodef_version = prodef_ref.version if prodef_ref else None
+    previous_digest = content_digest(file4) if file4 else None
+    workbook_key = (
+        igbot_digest,
+        input_file_name,
+        poid_ref.version,
+        prodef_version,
+        previous_digest,
+        ID,
+        output_format,
     )
 
-    # Write to the Excel sheet
-    po_df.to_excel(writer, sheet_name="PO", index=False)
-
-    # Rules-Keyword
-    df = pd.read_excel(file1, sheet_name="Rules-Keyword")
-
-    # Ensure the "Short Code" column exists and manipulate it as needed
-    if "Short Code" in df.columns:
-        # Convert to string and strip whitespace, replace NaN with empty strings
-        df["Short Code"] = df["Short Code"].astype(str).str.strip().replace("nan", "")
-    else:
-        # If "Short Code" column is missing, create it with default empty strings
-        df["Short Code"] = ""
-
-    # Replace any NaN with empty strings explicitly to avoid issues
-    df["Short Code"] = df["Short Code"].fillna("")
-
-    # Add the new column "Action" with the value "INSERT" for all rows
-    df["Action"] = "NO_CHANGE"
-
-    # Save the processed DataFrame to the output Excel file
-    df.to_excel(writer, sheet_name="Rules-Keyword", index=False)
-
-    # Rules-Alias
-    df = pd.read_excel(file1, sheet_name="Rules-Alias")
-
-    # Ensure the "Short Code" column exists and manipulate it as needed
-    if "Short Code" in df.columns:
-        # Convert to string and strip whitespace, replace NaN with empty strings
-        df["Short Code"] = df["Short Code"].astype(str).str.strip().replace("nan", "")
-    else:
-        # If "Short Code" column is missing, create it with default empty strings
-        df["Short Code"] = ""
-
-    # Replace any NaN with empty strings explicitly to avoid issues
-    df["Short Code"] = df["Short Code"].fillna("")
-
-    # Add the new column "Action" with the value "INSERT" for all rows
-    df["Action"] = "NO_CHANGE"
-
-    # Save the processed DataFrame to the output Excel file
-    df.to_excel(writer, sheet_name="Rules-Alias", index=False)
-
-    # Rules-Header
-    df = pd.read_excel(file1, sheet_name="Rules-Header")
-
-    # Ensure the "Short Code" column exists and manipulate it as needed
-    if "Ruleset Version" in df.columns:
-        # Convert to string, strip whitespace, and replace "nan" with empty strings
-        df["Ruleset Version"] = df["Ruleset Version"].astype(str).str.strip().replace("nan", "")
-    else:
-        # If "Ruleset Version" column is missing, create it with default empty strings
-        df["Ruleset Version"] = ""
-
-    # Replace any NaN with empty strings explicitly
-    df["Ruleset Version"] = df["Ruleset Version"].fillna("")
-
-    # Convert to numeric, coercing errors to NaN, then fill NaN with 0 and convert to integer
-    df["Ruleset Version"] = pd.to_numeric(df["Ruleset Version"], errors="coerce").fillna(0).astype(int)
-
-    # Set "Action" column based on condition
-    df["Action"] = np.where(df["Keyword"] == "AKTIF", "INSERT", "NO_CHANGE")
-
-    # Save the processed DataFrame to the output Excel file
-    df.to_excel(writer, sheet_name="Rules-Header", index=False)
-
-    # Process Rules-PCRF sheet
-    df_pcrf = pd.read_excel(file1, sheet_name="PCRF")
-    df_pcrf["Ruleset ShortName"] = df_pcrf["Ruleset ShortName"].astype(str).str.strip()
-
-    # Ensure Lifetime and MaxLifetime columns exist
-    columns_to_convert = ["LifeTime Validity", "MaxLife Time"]
-    for col in columns_to_convert:
-        if col in df_pcrf.columns:
-            # Convert to string, strip whitespace, and replace NaN with empty strings
-            df_pcrf[col] = df_pcrf[col].fillna("").astype(str).str.strip().replace("nan", "")
-        else:
-            # If column is missing, create it with default empty strings
-            df_pcrf[col] = ""
-
-    # Add the new column "Action" with the value "INSERT" for all rows
-    df_pcrf["Action"] = "INSERT"
-
-    # Save the updated DataFrame to the Excel sheet as PCRF
-    df_pcrf.to_excel(writer, sheet_name="PCRF", index=False)
-
-    # Handle specific sheets
-    try:
-        df = pd.read_excel(file1, sheet_name="Rules-Cases-Condition")
-        if "OpIndex" in df.columns:
-            df["OpIndex"] = pd.to_numeric(df["OpIndex"], errors="coerce").astype("Int64")
-        # Add the new column "Action" with value "INSERT" for all rows
-        df["Action"] = "INSERT"
-        df.loc[:, "Keyword Type"] = ""
-        
-        df.to_excel(writer, sheet_name="Rules-Cases-Condition", index=False)
-    except Exception as e:
-        st.error(f"Error processing 'Rules-Cases-Condition': {e}")
-
-    # Rules-Cases-Success
-    try:
-        df = pd.read_excel(file1, sheet_name="Rules-Cases-Success")
-        if "OpIndex" in df.columns:
-            df["OpIndex"] = pd.to_numeric(df["OpIndex"], errors="coerce").astype("Int64")
-        if "Ruleset ShortName" in df.columns:
-            df["Exit Value"] = df["Ruleset ShortName"].apply(
-                lambda x: "1" if pd.notna(x) and x.strip() != "" else ""
+    # A profiled run always rebuilds, in one thread, so cProfile sees every sheet transform;
+    # so does a memory-traced one, which gets each stage's allocation peak (pld/instrument.py)
+    capture_profile = st.checkbox("Capture a cProfile of the conversion")
+    instrumentation.trace_memory = st.checkbox("Trace the memory peak of every stage (slower, one sheet at a time)")
+    rebuild = capture_profile or instrumentation.trace_memory
+    cached_workbook = None if rebuild else workbook_cache.get(workbook_key)
+
+    if cached_workbook is None:
+        # A slot of the process-wide scheduler first (see pld/admission.py): queued sessions
+        # see their place in line, the running one a progress bar over its stages
+        queue_status = st.empty()
+
+        def show_queue(position, stats):
+            queue_status.info(
+                f"Waiting for a free conversion slot: position {position} in the queue "
+                f"({stats['running']} of {stats['max_running']} running)"
             )
-        # Add the new column "Action" with the value "INSERT" for all rows
-        df["Action"] = "INSERT"
-
-        df.to_excel(writer, sheet_name="Rules-Cases-Success", index=False)
-    except Exception as e:
-        st.error(f"Error processing 'Rules-Cases-Success': {e}")
-
-    # Example sheet creation: Rules-Messages
-    rule_message_df= pd.read_excel(file3, engine="openpyxl", sheet_name="Rules-Messages")
-    rule_message_df["Ruleset ShortName"] = rule_message_df["Ruleset ShortName"].astype(str).str.strip()
-    rule_message_df["Action"] = "INSERT"  # Add "Action" column with value "INSERT"
-
-    rule_message_df.to_excel(writer, sheet_name="Rules-Messages", index=False)
-
-    # Sheet 9: Rules-Price-Mapping
-    df_price_mapping = pd.read_excel(file1, sheet_name="Rules-Price-Mapping", engine="openpyxl")
-
-    # Convert "Variable Name" column to lowercase
-    if "Variable Name" in df_price_mapping.columns:
-        df_price_mapping["Variable Name"] = df_price_mapping["Variable Name"].str.lower()
-
-    # Ensure the "SID" column exists and manipulate it as needed
-    if "SID" in df_price_mapping.columns:
-        # Convert to string, strip whitespace, replace "nan"/"NaN", and handle numeric values
-        df_price_mapping["SID"] = (
-            df_price_mapping["SID"]
-            .astype(str)
-            .str.strip()
-            .replace(["nan", "NaN"], "")  # Handle different cases of "nan"
-            .apply(lambda x: str(int(float(x))) if x.replace(".", "").isdigit() else x)
-        )
-    else:
-        # If "SID" column is missing, create it with default empty strings
-        df_price_mapping["SID"] = ""
-
-    # Add the new column "Action" with the value "INSERT" for all rows
-    df_price_mapping["Action"] = "INSERT"
 
-    if file3:
-        try:
-            prodef_df = pd.read_excel(file3, sheet_name="Rules-Price", engine="openpyxl")
-        
-            # Ensure "Variable Name" column exists
-            if "Variable Name" in prodef_df.columns:
-                prodef_df["Variable Name"] = prodef_df["Variable Name"].astype(str).str.strip().str.lower()  # Normalize text
-        
-                # Filter for "dormant" rows
-                dormant_df = prodef_df[prodef_df["Variable Name"] == "dormant"].copy()
-    
-                if dormant_df.empty:
-                    st.warning("No 'dormant' rows found in 'Rules-Price'.")
-                else:    
-                    # Add POID from file1
-                    dormant_df["PO ID"] = final_poid
-    
-                    # Ensure necessary columns exist
-                    required_cols = ["SID", "Variable Name", "Resultant Shortname", "Action"]
-                    for col in required_cols:
-                        if col not in dormant_df.columns:
-                            dormant_df[col] = ""
-    
-                    # Set Action column to INSERT
-                    dormant_df["Action"] = "INSERT"
-        
-                    # Append to existing Rules-Price-Mapping
-                    df_price_mapping = pd.concat(
-                        [df_price_mapping, dormant_df],
-                        ignore_index=True, sort=False
-                    )
-    
-            else:
-                st.error("'Rules-Price' sheet in Prodef DMP is missing the 'Variable Name' column.")
-        except Exception as e:
-            st.error(f"Error processing 'Rules-Price' sheet in Prodef DMP file: {e}")
-    
-    # Save the modified Rules-Price-Mapping data to the Excel sheet
-    df_price_mapping.to_excel(writer, sheet_name="Rules-Price-Mapping", index=False)
-
-    # Sheet 10: Rules-Renewal
-    df = pd.read_excel(file1, sheet_name="Rules-Renewal")
-
-    # Convert "Max Cycle" and "Period" columns to integers
-    df["Max Cycle"] = pd.to_numeric(df["Max Cycle"], errors="coerce").astype("Int64")
-    df["Period"] = pd.to_numeric(df["Period"], errors="coerce").astype("Int64")
-
-    # Remove commas and decimals from "Amount" and truncate decimals
-    if "Amount" in df.columns:
-        # Remove commas, keep only numeric part, and truncate decimals
-        df["Amount"] = (
-            df["Amount"]
-            .astype(str)  # Convert everything to string first
-            .str.replace(",", "", regex=False)  # Remove commas
-            .str.split(".", n=1).str[0]  # Remove decimals
+        estimate = estimate_bytes(
+            len(input_file.getvalue()),
+            prodef_ref.size() if prodef_ref else None,
+            len(file4.getvalue()) if file4 else None,
         )
-        # Convert to integer
-        df["Amount"] = pd.to_numeric(df["Amount"], errors="coerce").astype("Int64")
-    else:
-        df["Amount"] = None  # Handle cases where "Amount" column is missing
+        with scheduler.slot(estimate, on_wait=show_queue):
+            queue_status.empty()
+            # Pre-conversion stages (Prodef, validation, iGBot and previous PLD parse) plus
+            # the sheet sequence of convert()
+            progress = Progress(3 + bool(file4) + expected_stages(previous=bool(file4)))
+            progress_bar = st.progress(0.0, text="Converting")
+            script_thread = threading.current_thread()
+
+            def show_progress(record):
+                # Elements only update from the script thread; stages that ran on the
+                # transform pool are counted and show up with the next one here
+                if threading.current_thread() is script_thread:
+                    progress_bar.progress(progress.fraction, text=f"{progress.describe()} ({progress.fraction:.0%})")
+
+            instrumentation.listeners += [progress, show_progress]
+            profiler = cProfile.Profile() if capture_profile else None
+            if profiler:
+                profiler.enable()
+
+            with instrumentation.stage("parse", sheet="Prodef DMP (reference store)") as record:
+                prodef_sheets = prodef_ref.sheets() if prodef_ref else Sheets()
+                record["rows_out"] = sum(len(df) for df in prodef_sheets.values())
+
+            # Check the iGBot headers (and first rows) and the Prodef sheets against the input
+            # schema before parsing anything in full; every violation is reported at once
+            try:
+                with instrumentation.stage("validate", sheet="(inputs)"):
+                    igbot_headers = read_headers(input_file, "igbot", digest=igbot_digest)
+                    schema_warnings = check({"igbot": igbot_headers, "prodef": prodef_sheets})
+            except SchemaError as e:
+                for violation in e.violations:
+                    getattr(st, violation.level)(str(violation))
+                st.stop()
+
+            # Open each workbook once and parse only the sheets the conversion needs, with
+            # compact dtypes (see the read specs in pld/schema.py); parsed sheets are served
+            # from the shared parse cache on later reruns
+            with instrumentation.stage("parse", sheet="iGBot file") as record:
+                igbot_sheets = load_sheets(input_file, IGBOT_SHEETS, digest=igbot_digest, specs=read_specs("igbot"))
+                record["rows_out"] = sum(len(df) for df in igbot_sheets.values())
+                record["engine"] = ", ".join(sorted(set(igbot_sheets.engines.values())))
+            previous_sheets = None
+            if file4:
+                try:
+                    with instrumentation.stage("parse", sheet="Previous PLD") as record:
+                        previous_sheets = read_previous(file4, final_poid)
+                        record["rows_out"] = sum(len(df) for df in previous_sheets.values())
+                except ValueError as e:
+                    st.error(f"Error reading the previous PLD: {e}")
+                    st.stop()
+
+            # Build every PLD sheet from the registry (independent sheets run in parallel)
+            # and write them in the required order. Large PLDs are spooled to a temp file
+            # (pld/spool.py) rather than kept in memory between reruns
+            output = SpooledOutput()
+            changes_output = SpooledOutput() if previous_sheets is not None else None
+            ctx = convert(
+                po,
+                igbot_sheets,
+                prodef_sheets,
+                output,
+                max_workers=1 if profiler else None,
+                instrumentation=instrumentation,
+                previous=previous_sheets,
+                changes_output=changes_output,
+                format=output_format,
+            )
 
-    # Ensure the "Reg Subaction" column exists and manipulate it as needed
-    if "Reg Subaction" in df.columns:
-        # Convert to string and strip whitespace, replace NaN with empty strings
-        df["Reg Subaction"] = df["Reg Subaction"].astype(str).str.strip().replace("nan", "")
-    else:
-        # If "Reg Subaction" column is missing, create it with default empty strings
-        df["Reg Subaction"] = ""
-
-    # Replace any NaN with empty strings explicitly to avoid issues
-    df["Reg Subaction"] = df["Reg Subaction"].fillna("")
-    
-    df["Flag Charge"] = df["Flag Charge"].astype(str).str.strip().str.upper()
-    df["Flag Suspend"] = df["Flag Suspend"].astype(str).str.strip().str.upper()
-    df["Flag Option"] = df["Flag Option"].astype(str).str.strip().str.upper()
-
-    # Add the new column "Action" with the value "INSERT" for all rows
-    df["Action"] = "INSERT"
-
-    # Save the modified DataFrame to the Excel sheet
-    df.to_excel(writer, sheet_name="Rules-Renewal", index=False)
-
-    # Sheet 11: Rules-GSI GRP Pack
-    gsi_grp_pack_df = pd.DataFrame(
-        {
-            "Ruleset ShortName": ["sample"],  # First row value
-            "GSI GRP Pack-Group ID": ["sample"],  # First row value
-            "Action": ["NO_CHANGE"],  # First row value
-        }
-    )
-    gsi_grp_pack_df.to_excel(writer, sheet_name="Rules-GSI GRP Pack", index=False)
-
-    # Sheet 12: Rules-Location Group
-    location_group_df = pd.DataFrame(
-        {
-            "Ruleset ShortName": ["sample"],
-            "Package Group": ["sample"],
-            "Microcluster ID": ["sample"],
-            "Action": ["NO_CHANGE"],
-        }
-    )
-    location_group_df.to_excel(writer, sheet_name="Rules-Location Group", index=False)
-
-    # Sheet 13: Rebuy-Out
-    rebuy_out_df = pd.DataFrame(
-        {
-            "Target PO ID": ["sample"],
-            "Target Ruleset ShortName": ["sample"],
-            "Target MPP": ["sample"],
-            "Target Group": ["sample"],
-            "Service Type": ["sample"],
-            "Rebuy Price": ["sample"],
-            "Allow Rebuy": ["sample"],
-            "Rebuy Option": ["sample"],
-            "Product Family": ["sample"],
-            "Source PO ID": ["sample"],
-            "Source Ruleset ShortName": ["sample"],
-            "Source MPP": ["sample"],
-            "Source Group": ["sample"],
-            "Vice Versa Consent": ["sample"],
-            "Action": ["NO_CHANGE"],
-        }
-    )
-    rebuy_out_df.to_excel(writer, sheet_name="Rebuy-Out", index=False)
-
-    # Sheet 14: Rebuy-Association
-    rebuy_association_df= pd.read_excel(file3, engine="openpyxl", sheet_name="Rebuy-Association")
-
-    rebuy_association_df["Service Type"] = "NA"
-    
-    rebuy_association_df["Rebuy Option"] = rebuy_association_df["Rebuy Option"].astype(str).str.strip()
-    rebuy_association_df["Source Ruleset ShortName"] = rebuy_association_df["Source Ruleset ShortName"].astype(str).str.strip().str.upper()
-    rebuy_association_df["Source MPP"] = rebuy_association_df["Source MPP"].astype(str).str.strip().str.upper()
-    
-    rebuy_association_df.to_excel(writer, sheet_name="Rebuy-Association", index=False)
-
-    # Sheet 15: Incompatibility
-    incompatibility_df = pd.DataFrame(
-        {
-            "ID": ["sample"],
-            "Target PO/RulesetShortName": ["sample"],
-            "Source Family": ["sample"],
-            "Source PO/RulesetShortName": ["sample"],
-            "Action": ["NO_CHANGE"],
-        }
-    )
-    incompatibility_df.to_excel(writer, sheet_name="Incompatibility", index=False)
-
-    # Sheet 16: Library-Addon-Name
-    df = pd.read_excel(file1, sheet_name="Library-Addon-Name")
-
-    # List of columns to process to maintain as string
-    columns_to_process = ["Master Shortcode", "Active Period Length", "Grace Period"]
-
-    for col in columns_to_process:
-        # Ensure the column exists
-        if col in df.columns:
-            # Convert to string, strip whitespace, replace NaN with empty strings
-            df[col] = df[col].fillna("").astype(str).str.strip().replace("nan", "")
-        else:
-            # If column is missing, create it with default empty strings
-            df[col] = ""
-
-    # Add the new column "Action" with the value "INSERT" for all rows
-    df["Action"] = "INSERT"
-
-    # Save the modified DataFrame to the Excel sheet
-    df.to_excel(writer, sheet_name="Library-Addon-Name", index=False)
-
-    # Sheet 17: Library-Addon-DA
-    df_library_addon_da = pd.read_excel(file3, engine="openpyxl", sheet_name="Library-Addon-DA")
-    df_library_addon_da["DA ID"] = df_library_addon_da["DA ID"].astype(str)
-    
-    # Ensure "Initial Value" is stored as a numeric value without scientific notation
-    if "Initial Value" in df_library_addon_da.columns:
-        # Apply formatting function
-        df_library_addon_da["Initial Value"] = df_library_addon_da["Initial Value"].apply(
-            lambda x: "{:.0f}".format(float(str(x).replace(",", ""))) if pd.notna(x) else x
+            if profiler:
+                profiler.disable()
+                profile_data = profile_bytes(profiler)
+                profile_text = profile_summary(profiler)
+
+            cached_workbook = (
+                output,
+                changes_output,
+                ctx.changes or {},
+                ctx.integrity,
+                [(v.level, str(v)) for v in schema_warnings] + ctx.messages,
+                list(instrumentation.stages),
+            )
+            instrumentation.listeners.clear()
+            progress_bar.empty()
+        # A profiled or memory-traced rebuild leaves a cached entry as it is: other sessions
+        # may be showing its download. This session serves its own build, whose spools go
+        # when nothing refers to them any more
+        workbook_cache.setdefault(workbook_key, cached_workbook)
+
+    workbook_spool, changes_spool, changes, integrity, messages, build_stages = cached_workbook
+    # The downloads read the spools only when clicked (Streamlit keeps that one copy). Cached
+    # spools belong to the workbook cache, which deletes their temp files on eviction
+    workbook_data = workbook_spool.getvalue
+    changes_data = changes_spool.getvalue if changes_spool else None
+    for level, message in messages:
+        getattr(st, level)(message)
+
+    # Ruleset ShortName / PO ID references across sheets, checked against Rules-Header and PO
+    with st.expander("🔗 Referential integrity"):
+        st.dataframe(integrity_frame(integrity), hide_index=True)
+
+    # Changes against the previous PLD: only INSERT / UPDATE / DELETE rows of the keyed
+    # sheets, the other sheets as in the full PLD
+    if changes_data:
+        st.write("Changes against the previous PLD")
+        st.dataframe(changes_frame(changes), hide_index=True)
+        st.download_button(
+            label="Download changes-only PLD",
+            data=changes_data,
+            file_name=changes_file_name(ID, final_poid, output_format),
+            mime=FORMATS[output_format][1],
         )
-    
-        # Convert to numeric after formatting to handle potential NaNs
-        df_library_addon_da["Initial Value"] = pd.to_numeric(df_library_addon_da["Initial Value"], errors="coerce").astype("Int64")
-    
-    df_library_addon_da["Action"] = "INSERT"
-    df_library_addon_da.to_excel(writer, sheet_name="Library-Addon-DA", index=False)
-        
-    # Sheet 18: Library-Addon-UCUT
-    library_addon_ucut_df = pd.DataFrame(
-        {
-            "Ruleset ShortName": ["sample"],
-            "PO ID": ["sample"],
-            "Quota Name": ["sample"],
-            "UCUT ID": ["sample"],
-            "Internal Description Bahasa": ["sample"],
-            "External Description Bahasa": ["sample"],
-            "Internal Description English": ["sample"],
-            "External Description English": ["sample"],
-            "Visibility": ["sample"],
-            "Custom": ["sample"],
-            "Initial Value": ["sample"],
-            "Unlimited Benefit Flag": ["sample"],
-            "Action": ["NO_CHANGE"],
-        }
-    )
-    library_addon_ucut_df.to_excel(writer, sheet_name="Library-Addon-UCUT", index=False)
-
-    # Sheet 19: Standalone - copy from file3.xlsx "StandAlone"
-    standalone_df= pd.read_excel(file3, engine="openpyxl", sheet_name="Standalone")
-    standalone_df["Ruleset ShortName"] = standalone_df["Ruleset ShortName"].astype(str).str.strip()
-    standalone_df["Action"] = "INSERT"  # Add "Action" column with value "INSERT"
-
-    # Convert 'Value', 'UOM', 'Validity' column to string in standalone_df
-    standalone_df['Value'] = standalone_df['Value'].astype(str)
-    standalone_df['UOM'] = standalone_df['UOM'].astype(str)
-    standalone_df['Validity'] = standalone_df['Validity'].astype(str)
-    standalone_df['ID'] = standalone_df['ID'].astype(str)
-    
-    standalone_df.to_excel(writer, sheet_name="Standalone", index=False)
-
-    # Sheet 20: Blacklist-Gift-Promocodes
-    blacklist_gift_promocodes_df = pd.DataFrame(
-        [{"Ruleset ShortName": "sample", "Coherence Key": "sample", "Promo Codes": "sample", "Action": "NO_CHANGE"}]
-    )
-    blacklist_gift_promocodes_df.to_excel(writer, sheet_name="Blacklist-Gift-Promocodes", index=False)
 
-    # Sheet 21: Blacklist-Promocodes
-    blacklist_promocodes_df = pd.DataFrame(
-        [{"PO ID": "sample", "Command/Keyword": "sample", "Promo Codes": "sample", "Action": "NO_CHANGE"}]
-    )
-    blacklist_promocodes_df.to_excel(writer, sheet_name="Blacklist-Promocodes", index=False)
+if len(input_files) > 1 and poid_ref:
+    # Several iGBot files: one PLD per file, converted concurrently against the same POID
+    # and Prodef data; every PLD goes into a zip on disk as soon as it is finished
+    poids = [extract_poid(f.name) for f in input_files]
+    invalid = [f.name for f, poid in zip(input_files, poids) if not poid]
+    if invalid:
+        st.error(f"Invalid input file name format. Unable to extract POID from: {', '.join(invalid)}")
+        st.stop()
+    if not file2:
+        st.info(f"Using the stored POID matching file {poid_ref.describe()}")
+    if prodef_ref and not file3:
+        st.info(f"Using the stored Prodef DMP file {prodef_ref.describe()}")
 
-    # Sheet 22: MYIM3-UNREG
-    myim3_unreg_df = pd.DataFrame(
-        [
+    ID = st.text_input("Enter the PLD ID:")
+    if not ID:
+        st.warning("Please enter an ID to proceed.")
+        st.stop()
+    consecutive = ID.isdigit() and st.checkbox("Number the files consecutively from this ID")
+    id_table = st.data_editor(
+        pd.DataFrame(
             {
-                "Ruleset ShortName": "sample",
-                "Keyword": "sample",
-                "Shortcode": "sample",
-                "Unreg Flag": "sample",
-                "Buy Extra Flag": "sample",
-                "Action": "NO_CHANGE",
+                "file": [f.name for f in input_files],
+                "POID": poids,
+                "PLD ID": [str(int(ID) + i) if consecutive else ID for i in range(len(input_files))],
             }
-        ]
-    )
-    myim3_unreg_df.to_excel(writer, sheet_name="MYIM3-UNREG", index=False)
-
-    # Sheet 23: ExtraPOConfig
-    extrapoconfig_df = pd.DataFrame(
-        [{"Ruleset ShortName": "sample", "Extra PO Keyword": "sample", "Action": "NO_CHANGE"}]
+        ),
+        disabled=["file", "POID"],
+        hide_index=True,
     )
-    extrapoconfig_df.to_excel(writer, sheet_name="ExtraPOConfig", index=False)
+    # One PLD ID per file; two files of the same POID need different IDs, or both PLDs
+    # would be written to the same PLD_{ID}_{POID} file
+    file_ids = list(id_table["PLD ID"].astype(str).str.strip())
+    clashes = [pair for pair, count in Counter(zip(file_ids, poids)).items() if count > 1]
+    if clashes:
+        st.error(
+            "Several files would get the same PLD file name: "
+            + ", ".join(pld_file_name(pld_id, poid, output_format) for pld_id, poid in clashes)
+            + ". Give each of them its own PLD ID."
+        )
+        st.stop()
 
-    # Sheet 24: Keyword-Global-Variable
-    keyword_global_variable_df = pd.DataFrame(
-        [
-            {
-                "PO ID": "sample",
-                "Keyword": "sample",
-                "Global Variable Type": "sample",
-                "Value": "sample",
-                "Keyword Type": "sample",
-                "Action": "NO_CHANGE",
-            }
-        ]
+    batch_key = (
+        tuple((content_digest(f), f.name) for f in input_files),
+        poid_ref.version,
+        prodef_ref.version if prodef_ref else None,
+        tuple(file_ids),
+        output_format,
     )
-    keyword_global_variable_df.to_excel(writer, sheet_name="Keyword-Global-Variable", index=False)
+    batch = st.session_state.get("pld_batch")
+    if batch and batch["key"] != batch_key:
+        batch = None
+    if batch is None and st.button(f"Convert {len(input_files)} files"):
+        previous_batch = st.session_state.pop("pld_batch", None)
+        if previous_batch:
+            previous_batch["dir"].cleanup()
+
+        # Removed with the next batch, or with the session state when the session ends
+        scratch = ScratchDir(prefix="pld-batch-")
+        work_dir = scratch.path
+        input_dir = os.path.join(work_dir, "inputs")
+        os.makedirs(input_dir)
+        paths = []
+        # A directory per upload, so files uploaded under the same name do not overwrite each other
+        for i, f in enumerate(input_files):
+            paths.append(os.path.join(input_dir, str(i), f.name))
+            os.makedirs(os.path.dirname(paths[-1]))
+            with open(paths[-1], "wb") as out:
+                out.write(f.getvalue())
+        ids = dict(zip(paths, file_ids))
+
+        progress = st.progress(0.0, text=f"Converting {len(paths)} files")
+        file_status = [st.empty() for _ in paths]
+        for status, f in zip(file_status, input_files):
+            status.caption(f"⏳ {f.name}")
+
+        # The files converted at once take as many scheduler slots, with the memory estimate
+        # of the largest ones; the batch waits in the same queue as single conversions
+        jobs = min(4, os.cpu_count() or 1, scheduler.max_running)
+        sizes = sorted((len(f.getvalue()) for f in input_files), reverse=True)[:jobs]
+        estimate = estimate_bytes(*sizes, prodef_ref.size() if prodef_ref else None)
+
+        def show_queue(position, stats):
+            progress.progress(
+                0.0,
+                text=f"Waiting for free conversion slots: position {position} in the queue "
+                f"({stats['running']} of {stats['max_running']} running)",
+            )
 
-    # Sheet 25: UMB-Push-Category
-    umb_push_category_df= pd.read_excel(file3, engine="openpyxl", sheet_name="UMB-Push-Category")
-    umb_push_category_df["Action"]= "INSERT"
-    
-    umb_push_category_df.to_excel(writer, sheet_name="UMB-Push-Category", index=False)
+        with scheduler.slot(estimate, slots=jobs, on_wait=show_queue):
+            prodef_sheets = prodef_ref.sheets() if prodef_ref else Sheets()
+            zip_path = os.path.join(work_dir, "PLD_files.zip")
+            rows = [None] * len(paths)
+            # xlsx files and bundles are already compressed, so the members are stored as they are
+            with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_STORED) as archive:
+                for done, (i, row) in enumerate(
+                    iter_batch(
+                        paths,
+                        poid_ref,
+                        prodef_sheets,
+                        ids,
+                        ID,
+                        os.path.join(work_dir, "out"),
+                        jobs,
+                        threads=True,
+                        format=output_format,
+                    ),
+                    start=1,
+                ):
+                    rows[i] = row
+                    name = input_files[i].name
+                    if row["status"] == "failed":
+                        file_status[i].error(f"{name}: {row['messages']}")
+                    else:
+                        archive.write(row["output"], os.path.basename(row["output"]))
+                        os.remove(row["output"])
+                        icon = "⚠️" if row["status"] == "warning" else "✅"
+                        file_status[i].caption(
+                            f"{icon} {name} → {os.path.basename(row['output'])} ({row['seconds']:.1f}s)"
+                        )
+                    progress.progress(done / len(paths), text=f"{done}/{len(paths)} files converted")
+
+        summary = pd.DataFrame(rows)[["file", "poid", "id", "output", "dangling", "status", "seconds", "messages"]]
+        summary["file"] = [f.name for f in input_files]
+        summary["output"] = summary["output"].map(os.path.basename)
+        with zipfile.ZipFile(zip_path, "a", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("summary.csv", summary.to_csv(index=False))
+        batch = {"key": batch_key, "dir": scratch, "zip": zip_path, "summary": summary}
+        st.session_state["pld_batch"] = batch
+
+    if batch:
+        st.dataframe(batch["summary"], hide_index=True)
+        zip_path = batch["zip"]
+
+        def read_zip():
+            # Read from disk only when the button is clicked
+            with open(zip_path, "rb") as f:
+                return f.read()
+
+        st.download_button(
+            label="Download PLD files (.zip)",
+            data=read_zip,
+            file_name="PLD_files.zip",
+            mime="application/zip",
+        )
 
-    # Sheet 26: Avatar-Channel
-    avatar_channel_df = pd.DataFrame(
-        [
-            {
-                "PO ID": "sample",
-                "Ruleset ShortName": "sample",
-                "Keyword": "sample",
-                "Commercial Name": "sample",
-                "Short Code": "sample",
-                "PVR ID": "sample",
-                "Price": "sample",
-                "Action": "NO_CHANGE",
-            }
-        ]
+with st.expander("🔍 Diagnostics"):
+    st.write(f"Output file name: {output_file_name}")
+
+    # Parse and workbook cache counters (shared by every session on this server)
+    cache_stats = parse_cache.stats()
+    workbook_stats = workbook_cache.stats()
+    st.caption(
+        f"Parse cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses, "
+        f"{cache_stats['entries']} sheets cached ({cache_stats['bytes'] / 1_048_576:.1f} MB) · "
+        f"Workbook cache: {workbook_stats['hits']} hits / {workbook_stats['misses']} misses, "
+        f"{workbook_stats['disk_bytes'] / 1_048_576:.1f} MB spooled to disk · "
+        f"Excel reader: {resolve_engine()}"
     )
-    avatar_channel_df.to_excel(writer, sheet_name="Avatar-Channel", index=False)
-
-    # Sheet 27: Dormant-Config
-    dormant_config_df = pd.DataFrame(
-        [{"Ruleset ShortName": "sample", "Keyword": "sample", "Short Code": "sample", "Pvr": "sample", "Action": "NO_CHANGE"}]
+    # Conversions admitted by the process-wide scheduler (pld/admission.py)
+    scheduler_stats = scheduler.stats()
+    st.caption(
+        f"Conversions: {scheduler_stats['running']} of {scheduler_stats['max_running']} running, "
+        f"{scheduler_stats['waiting']} waiting, {scheduler_stats['reserved_mb']:.0f} of "
+        f"{scheduler_stats['memory_budget_mb']:.0f} MB reserved, {scheduler_stats['admitted']} admitted"
+    )
+    for label, reference in (("POID matching file", poid_ref), ("Prodef DMP", prodef_ref)):
+        st.caption(f"{label}: {reference.describe() if reference else 'none'}")
+    st.caption(
+        f"Warm-up ({warmup.status['hook']}): {warmup.status['state']}"
+        + (f" in {warmup.status['seconds']:.2f}s" if warmup.status["seconds"] is not None else "")
     )
-    dormant_config_df.to_excel(writer, sheet_name="Dormant-Config", index=False)
-
-    writer.close()  # Ensure writer is closed
 
-# Ensure output is written before seeking
-output.seek(0)
+    # Stages of the conversion that built the current workbook; on a workbook cache hit
+    # these come from the earlier run, and this rerun's own stages are listed separately
+    if build_stages:
+        build_timings = stages_frame(build_stages)
+        st.write(f"Conversion stages ({build_timings['seconds'].sum():.2f}s total)")
+        st.dataframe(build_timings, hide_index=True)
+    if instrumentation.stages and instrumentation.stages != build_stages:
+        st.write("This rerun")
+        st.dataframe(instrumentation.to_frame(), hide_index=True)
+    st.caption(
+        "rss_delta_mb: change of the process' resident memory over the stage (includes other "
+        "sheets built at the same time) · peak_alloc_mb: most memory the stage allocated at "
+        "once, with memory tracing on"
+    )
 
-st.write(f"🔍 Debug: output_file_name = {output_file_name}")  # Debug log
+    if profile_data:
+        st.download_button(
+            label="Download cProfile stats (.prof)",
+            data=profile_data,
+            file_name=f"{output_file_name.rsplit('.', 1)[0]}.prof",
+            mime="application/octet-stream",
+        )
+        st.code(profile_text)
 
 # Streamlit download button
-st.download_button(
-    label="Download Excel File",
-    data=output.getvalue(),
-    file_name=output_file_name,  
-    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-)
+if len(input_files) <= 1:
+    st.download_button(
+        label="Download Excel File" if output_format == "xlsx" else f"Download PLD ({output_format} bundle)",
+        data=workbook_data,
+        file_name=output_file_name,
+        mime=FORMATS[output_format][1],
+    )
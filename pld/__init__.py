@@ -0,0 +1 @@
+# Helpers shared by the iGBot -> PLD Streamlit page (igbot_to_pct.py)
@@ -0,0 +1,124 @@
+# Process-wide admission control for conversions started from the Streamlit page.
+#
+# Every session runs its conversion in its own script thread, so without a limit a few
+# large uploads at once make the host swap and slow every conversion down. A conversion
+# first takes a slot from `scheduler` (a multi-file batch takes one per file it converts
+# at once):
+#   - at most max_running conversions run at once (PLD_MAX_CONVERSIONS, default 2)
+#   - the memory estimates of the running conversions stay within memory_budget
+#     (PLD_MEMORY_BUDGET_MB, default 2048); a conversion estimated above the budget still
+#     runs, but only when nothing else does
+# Waiting conversions are admitted in arrival order, so a large one is not overtaken
+# forever by small ones. While queued, on_wait is called in the waiting thread with the
+# queue position, which is where the page shows it (and where Streamlit stops the wait
+# when the session reruns or goes away).
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+MB = 1024 * 1024
+# Memory a conversion takes per byte of its input files: the process RSS grows by 13-18x
+# the iGBot xlsx size while parsing, transforming and writing it (synthetic inputs,
+# 5k-20k rows per sheet)
+EXPANSION = 20
+POLL_SECONDS = 0.5
+
+
+def estimate_bytes(*sizes):
+    # Expected memory of a conversion of input files of these sizes (None for absent ones)
+    return EXPANSION * sum(size for size in sizes if size)
+
+
+class Ticket:
+    def __init__(self, estimate, slots):
+        self.estimate = estimate
+        self.slots = slots
+        self.queued_at = time.monotonic()
+        self.started_at = None
+
+    @property
+    def waited(self):
+        return (self.started_at or time.monotonic()) - self.queued_at
+
+
+class Scheduler:
+    def __init__(self, max_running=2, memory_budget=2048 * MB):
+        self.max_running = max_running
+        self.memory_budget = memory_budget
+        self._waiting = deque()
+        self._running = []
+        self._used = 0
+        self._reserved = 0
+        self._cond = threading.Condition()
+        self.admitted = 0
+
+    def _admissible(self, ticket):
+        # Anything fits when nothing runs, so oversized requests still get their turn
+        if self._waiting[0] is not ticket:
+            return False
+        if not self._running:
+            return True
+        return (
+            self._used + ticket.slots <= self.max_running
+            and self._reserved + ticket.estimate <= self.memory_budget
+        )
+
+    @contextmanager
+    def slot(self, estimate=0, slots=1, on_wait=None):
+        # Wait for `slots` slots, run the block in them, free them on exit.
+        # on_wait(position, stats) is called about every POLL_SECONDS while waiting; an
+        # exception it raises leaves the queue
+        ticket = Ticket(estimate, slots)
+        with self._cond:
+            self._waiting.append(ticket)
+        try:
+            while True:
+                with self._cond:
+                    if self._admissible(ticket):
+                        self._waiting.popleft()
+                        self._running.append(ticket)
+                        self._used += ticket.slots
+                        self._reserved += ticket.estimate
+                        ticket.started_at = time.monotonic()
+                        self.admitted += 1
+                        # The next one in line may fit as well
+                        self._cond.notify_all()
+                        break
+                    position = self._waiting.index(ticket) + 1
+                if on_wait is not None:
+                    on_wait(position, self.stats())
+                with self._cond:
+                    self._cond.wait(POLL_SECONDS)
+        except BaseException:
+            with self._cond:
+                self._waiting.remove(ticket)
+                self._cond.notify_all()
+            raise
+
+        try:
+            yield ticket
+        finally:
+            with self._cond:
+                self._running.remove(ticket)
+                self._used -= ticket.slots
+                self._reserved -= ticket.estimate
+                self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "running": self._used,
+                "waiting": len(self._waiting),
+                "max_running": self.max_running,
+                "reserved_mb": round(self._reserved / MB, 1),
+                "memory_budget_mb": round(self.memory_budget / MB, 1),
+                "admitted": self.admitted,
+            }
+
+
+scheduler = Scheduler(
+    max_running=max(1, int(os.environ.get("PLD_MAX_CONVERSIONS", 2))),
+    memory_budget=int(os.environ.get("PLD_MEMORY_BUDGET_MB", 2048)) * MB,
+)
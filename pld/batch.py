@@ -0,0 +1,345 @@
+# Headless batch conversion of many iGBot result files:
+#
+#   python -m pld.batch "results/*.xlsx" --poid-file Roaming_SC_Completion_v1.xlsx \
+#       --prodef-file Prodef_DMP.xlsx --ids ids.csv --out-dir pld_out --jobs 4
+#
+# The POID matching and Prodef DMP files come from the reference store (pld/refstore.py):
+# --poid-file / --prodef-file import a file first (a no-op when it is already stored),
+# without them the current stored versions are used. The Prodef sheets are loaded once
+# in the parent process and handed to each worker process at start-up; the workers
+# look POIDs up in the stored POID index and only parse their own iGBot file.
+#
+# With --previous-dir, every POID whose PLD_{ID}_{POID}.xlsx is found there also gets a
+# changes-only PLD_{ID}_{POID}_changes.xlsx (see pld/diff.py). Pointing --previous-dir at
+# the last run's --out-dir works: each previous PLD is read before it is overwritten.
+#
+# --format csv / parquet writes each PLD as a bundle of per-sheet CSV or Parquet files
+# (PLD_{ID}_{POID}.csv.zip, see pld/bundle.py) instead of the workbook. Previous PLDs are
+# always read from the xlsx workbooks.
+#
+# IDs are looked up per file: an --ids entry for the file name wins over one for its
+# POID, then --id. Two files that would get the same output name (same PLD ID and POID)
+# are not converted concurrently into the same file: the later one fails with a message
+# and the earlier one is converted.
+import argparse
+import csv
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from pld.convert import FORMATS, WRITERS, changes_file_name, convert, extract_poid, pld_file_name
+from pld.diff import read_previous
+from pld.loader import DEFAULT_ENGINE, ENGINES, Sheets, load_sheets
+from pld.refstore import DEFAULT_STORE, current_reference, import_reference
+from pld.schema import SchemaError, check, read_headers, read_specs
+from pld.sheets import IGBOT_SHEETS
+
+SUMMARY_COLUMNS = ["file", "poid", "id", "output", "changes", "dangling", "status", "seconds", "messages"]
+
+# Reference data of the worker process, set once by _init_worker
+_poid_ref = None
+_prodef_sheets = None
+
+
+def find_igbot_files(pattern):
+    # A directory means every .xlsx directly inside it
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "*.xlsx")
+    # Skip Excel lock files (~$name.xlsx)
+    return sorted(p for p in glob.glob(pattern) if not os.path.basename(p).startswith("~$"))
+
+
+def read_id_mapping(path):
+    # CSV or xlsx with "POID" and "ID" columns; an optional "file" column gives a row to
+    # one iGBot file (by file name) instead of every file of its POID
+    if path.lower().endswith(".csv"):
+        df = pd.read_csv(path, dtype=str)
+    else:
+        df = pd.read_excel(path, dtype=str)
+    missing = {"POID", "ID"} - set(df.columns)
+    if missing:
+        raise ValueError(f"ID mapping {path} is missing columns: {sorted(missing)}")
+    keys = df["POID"].str.strip()
+    if "file" in df.columns:
+        keys = df["file"].str.strip().where(df["file"].notna() & (df["file"].str.strip() != ""), keys)
+    return dict(zip(keys, df["ID"].str.strip()))
+
+
+def file_id(path, poid, ids, default_id):
+    # PLD ID of one file: its own entry (path or file name), then its POID's, then default_id
+    for key in (path, os.path.basename(path), poid):
+        if key in ids:
+            return ids[key]
+    return default_id
+
+
+def _summary_row(path):
+    row = dict.fromkeys(SUMMARY_COLUMNS, "")
+    row.update(file=path, dangling=0, status="ok", seconds=0.0)
+    return row
+
+
+def reference(kind, path, store, engine=None):
+    # Import `path` into the store when given, else the current stored version (or None)
+    if not path:
+        return current_reference(kind, store)
+    with open(path, "rb") as f:
+        return import_reference(kind, f.read(), source=os.path.basename(path), store=store, engine=engine)
+
+
+def _init_worker(poid_ref, prodef_sheets):
+    global _poid_ref, _prodef_sheets
+    _poid_ref = poid_ref
+    _prodef_sheets = prodef_sheets
+
+
+def convert_file(
+    path,
+    ids,
+    default_id,
+    out_dir,
+    writer="streaming",
+    engine=None,
+    previous_dir=None,
+    poid_ref=None,
+    prodef_sheets=None,
+    format="xlsx",
+):
+    # Reference data defaults to what _init_worker set in this worker process
+    poid_ref = poid_ref or _poid_ref
+    prodef_sheets = _prodef_sheets if prodef_sheets is None else prodef_sheets
+    start = time.perf_counter()
+    row = _summary_row(path)
+    try:
+        poid = extract_poid(os.path.basename(path))
+        if not poid:
+            raise ValueError("Invalid input file name format. Unable to extract POID.")
+        row["poid"] = poid
+
+        po = poid_ref.match_poid(poid)
+        if po is None:
+            raise ValueError(f"No matching POID found for '{poid}' in the POID matching file.")
+
+        pld_id = file_id(path, poid, ids, default_id)
+        if not pld_id:
+            raise ValueError(f"No PLD ID for POID '{poid}'.")
+        row["id"] = pld_id
+
+        with open(path, "rb") as f:
+            data = f.read()
+        # Every schema violation of this file at once, before the full parse
+        schema_warnings = check({"igbot": read_headers(data, "igbot", engine=engine), "prodef": prodef_sheets})
+        igbot_sheets = load_sheets(data, IGBOT_SHEETS, cache=None, engine=engine, specs=read_specs("igbot"))
+
+        previous = None
+        changes_output = None
+        previous_path = os.path.join(previous_dir, pld_file_name(pld_id, po[0])) if previous_dir else None
+        if previous_path and os.path.exists(previous_path):
+            with open(previous_path, "rb") as f:
+                previous = read_previous(f.read(), po[0], engine=engine)
+            changes_output = os.path.join(out_dir, changes_file_name(pld_id, po[0], format))
+
+        output = os.path.join(out_dir, pld_file_name(pld_id, po[0], format))
+        # One sheet at a time inside a worker; the parallelism is across files
+        ctx = convert(
+            po,
+            igbot_sheets,
+            prodef_sheets.copy(),
+            output,
+            max_workers=1,
+            writer=writer,
+            previous=previous,
+            changes_output=changes_output,
+            format=format,
+        )
+        row["output"] = output
+        row["changes"] = changes_output or ""
+        # Rows whose Ruleset ShortName / PO ID references point at no key, see pld/integrity.py
+        row["dangling"] = sum(entry["dangling rows"] for entry in ctx.integrity)
+        messages = [(v.level, str(v)) for v in schema_warnings] + ctx.messages
+        row["messages"] = "; ".join(f"{level}: {message}" for level, message in messages)
+        if any(level == "error" for level, _ in ctx.messages):
+            row["status"] = "warning"
+    except SchemaError as e:
+        row["status"] = "failed"
+        row["messages"] = str(e)
+    except Exception as e:
+        row["status"] = "failed"
+        row["messages"] = f"{type(e).__name__}: {e}"
+    row["seconds"] = round(time.perf_counter() - start, 3)
+    return row
+
+
+def output_collisions(files, poid_ref, ids, default_id, format="xlsx"):
+    # Position in files -> summary row of a failed file, for each file whose output name a
+    # file before it already has. Files whose output name cannot be worked out here are
+    # left to convert_file, which reports why
+    taken = {}
+    failed = {}
+    for i, path in enumerate(files):
+        poid = extract_poid(os.path.basename(path))
+        po = poid_ref.match_poid(poid) if poid else None
+        pld_id = file_id(path, poid, ids, default_id)
+        if po is None or not pld_id:
+            continue
+        name = pld_file_name(pld_id, po[0], format)
+        if name in taken:
+            row = _summary_row(path)
+            row.update(poid=poid, id=pld_id, status="failed")
+            row["messages"] = (
+                f"{name} is also the output of {os.path.basename(taken[name])}; give this file its own PLD ID"
+            )
+            failed[i] = row
+        else:
+            taken[name] = path
+    return failed
+
+
+def iter_batch(
+    files,
+    poid_ref,
+    prodef_sheets,
+    ids,
+    default_id,
+    out_dir,
+    jobs,
+    writer="streaming",
+    engine=None,
+    previous_dir=None,
+    threads=False,
+    format="xlsx",
+):
+    # Yield (position in files, summary row) as each file finishes.
+    # threads=True converts on a thread pool in this process (the Streamlit page, where
+    # forking the server is not an option); otherwise worker processes are used.
+    os.makedirs(out_dir, exist_ok=True)
+    collisions = output_collisions(files, poid_ref, ids, default_id, format)
+    yield from collisions.items()
+    args = (ids, default_id, out_dir, writer, engine, previous_dir)
+    if threads:
+        pool = ThreadPoolExecutor(max_workers=jobs)
+        references = {"poid_ref": poid_ref, "prodef_sheets": prodef_sheets}
+    else:
+        pool = ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(poid_ref, prodef_sheets))
+        references = {}
+    with pool:
+        futures = {
+            pool.submit(convert_file, path, *args, format=format, **references): i
+            for i, path in enumerate(files)
+            if i not in collisions
+        }
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def run_batch(
+    files,
+    poid_ref,
+    prodef_sheets,
+    ids,
+    default_id,
+    out_dir,
+    jobs,
+    writer="streaming",
+    engine=None,
+    previous_dir=None,
+    format="xlsx",
+):
+    # Summary rows in input order
+    rows = [None] * len(files)
+    for i, row in iter_batch(
+        files, poid_ref, prodef_sheets, ids, default_id, out_dir, jobs, writer, engine, previous_dir, format=format
+    ):
+        rows[i] = row
+    return rows
+
+
+def write_summary(rows, path):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m pld.batch", description="Convert iGBot result files to PLD workbooks.")
+    parser.add_argument("inputs", help="directory or glob of iGBot result files")
+    parser.add_argument(
+        "--poid-file", help="POID matching file (Roaming_SC_Completion_v1.xlsx); default: the stored one"
+    )
+    parser.add_argument("--prodef-file", help="Prodef DMP file; default: the stored one")
+    parser.add_argument("--store", default=DEFAULT_STORE, help="reference store directory (default: %(default)s)")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--ids", help="CSV/xlsx mapping with POID and ID columns (and optionally file)")
+    group.add_argument("--id", help="PLD ID used for every file")
+    parser.add_argument("--out-dir", default="pld_output", help="directory for the PLD files and summary.csv")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--writer", choices=WRITERS, default="streaming", help="xlsx writer (default: %(default)s)")
+    parser.add_argument(
+        "--format",
+        choices=tuple(FORMATS),
+        default="xlsx",
+        help="PLD workbook, or a zip of per-sheet CSV / Parquet files (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=("auto", *ENGINES),
+        default=DEFAULT_ENGINE,
+        help="Excel reader engine; auto uses calamine when installed (default: %(default)s)",
+    )
+    parser.add_argument("--previous-dir", help="directory of the previous full PLDs, to also write changes-only PLDs")
+    args = parser.parse_args(argv)
+
+    poid_ref = reference("poid", args.poid_file, args.store, args.engine)
+    if poid_ref is None:
+        parser.error(f"no --poid-file given and no POID matching file in the reference store {args.store!r}")
+    prodef_ref = reference("prodef", args.prodef_file, args.store, args.engine)
+
+    # The reference files often sit next to the iGBot files; never treat them (or files
+    # named like the stored ones) as inputs
+    references = {os.path.abspath(p) for p in (args.poid_file, args.prodef_file) if p}
+    stored = {ref.source for ref in (poid_ref, prodef_ref) if ref}
+    files = [
+        p
+        for p in find_igbot_files(args.inputs)
+        if os.path.abspath(p) not in references and os.path.basename(p) not in stored
+    ]
+    if not files:
+        parser.error(f"no iGBot files match {args.inputs!r}")
+
+    ids = read_id_mapping(args.ids) if args.ids else {}
+    prodef_sheets = prodef_ref.sheets() if prodef_ref else Sheets()
+
+    start = time.perf_counter()
+    rows = run_batch(
+        files,
+        poid_ref,
+        prodef_sheets,
+        ids,
+        args.id,
+        args.out_dir,
+        max(1, args.jobs),
+        args.writer,
+        args.engine,
+        args.previous_dir,
+        args.format,
+    )
+    summary_path = os.path.join(args.out_dir, "summary.csv")
+    write_summary(rows, summary_path)
+
+    for row in rows:
+        print(f"{row['status']:<8} {row['seconds']:>7.2f}s  {os.path.basename(row['file'])} -> {row['output'] or row['messages']}")
+    failed = sum(row["status"] == "failed" for row in rows)
+    print(
+        f"{len(rows) - failed}/{len(rows)} converted in {time.perf_counter() - start:.1f}s, "
+        f"summary written to {summary_path}"
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
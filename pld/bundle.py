@@ -0,0 +1,111 @@
+# CSV and Parquet bundles of the PLD, for consumers that load it programmatically.
+#
+# A bundle is a zip with one member per PLD sheet, named after the sheet ("PCRF.csv",
+# "Rules-Header.parquet") and added in the workbook's sheet order; every member keeps the
+# sheet's columns in the same order. The bundle writers take the same calls as
+# StreamingWorkbookWriter, so write_sheets fills them from the same results.
+#
+#   csv:     UTF-8 with a header row. Cells hold the text the xlsx PLD reads back as
+#            (1.0 -> "1", blank -> empty), so a CSV bundle and the xlsx PLD of the same
+#            conversion give the same table with dtype=str.
+#   parquet: numeric, boolean, Int64, categorical and text columns keep their type;
+#            object columns holding mixed values (ints and strings read from the same
+#            Excel column) are stored as the cell text above, as Parquet needs one type
+#            per column.
+import io
+import zipfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pandas.api.types import infer_dtype
+
+from pld.writer import CHUNK_ROWS, cell_value, column_text
+
+
+def _header(columns):
+    return [str(cell_value(name)) for name in columns]
+
+
+def _text_frame(df):
+    return pd.DataFrame({i: column_text(df.iloc[:, i]) for i in range(df.shape[1])}, index=df.index)
+
+
+class _BundleWriter:
+    extension = None
+    compression = zipfile.ZIP_STORED
+
+    def __init__(self, output):
+        self.archive = zipfile.ZipFile(output, "w", self.compression)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write_template(self, sheet_name, template):
+        self.write_frame(sheet_name, template.to_frame())
+
+    def close(self):
+        self.archive.close()
+
+
+class CsvBundleWriter(_BundleWriter):
+    extension = ".csv"
+    # Text compresses several times over
+    compression = zipfile.ZIP_DEFLATED
+
+    def write_frame(self, sheet_name, df):
+        with self.archive.open(sheet_name + self.extension, "w") as member:
+            text = io.TextIOWrapper(member, encoding="utf-8", newline="")
+            pd.DataFrame(columns=_header(df.columns)).to_csv(text, index=False)
+            # Cell text one chunk at a time, as the xlsx writer does
+            for start in range(0, len(df), CHUNK_ROWS):
+                _text_frame(df.iloc[start : start + CHUNK_ROWS]).to_csv(text, index=False, header=False)
+            text.flush()
+            text.detach()
+
+
+def _parquet_column(s):
+    # s as Arrow can store it, see the format notes above
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        if s.cat.categories.dtype == object and infer_dtype(s.cat.categories) != "string":
+            return column_text(s)
+        return s
+    if s.dtype == object and infer_dtype(s, skipna=True) not in ("string", "empty"):
+        return column_text(s)
+    return s
+
+
+class ParquetBundleWriter(_BundleWriter):
+    extension = ".parquet"
+    # Parquet pages are already compressed
+    compression = zipfile.ZIP_STORED
+
+    def write_frame(self, sheet_name, df):
+        arrays = [
+            pa.array(_parquet_column(df.iloc[:, i].reset_index(drop=True)), from_pandas=True) for i in range(df.shape[1])
+        ]
+        table = pa.table(arrays, names=_header(df.columns))
+        buffer = io.BytesIO()
+        pq.write_table(table, buffer)
+        self.archive.writestr(sheet_name + self.extension, buffer.getvalue())
+
+
+BUNDLE_WRITERS = {"csv": CsvBundleWriter, "parquet": ParquetBundleWriter}
+
+
+def read_bundle(upload):
+    # {sheet name: DataFrame} of a bundle in sheet order; CSV cells come back as text
+    data = upload.getvalue() if hasattr(upload, "getvalue") else upload
+    sheets = {}
+    with zipfile.ZipFile(io.BytesIO(data) if isinstance(data, bytes) else data) as archive:
+        for info in archive.infolist():
+            name, _, extension = info.filename.rpartition(".")
+            with archive.open(info) as member:
+                if extension == "csv":
+                    sheets[name] = pd.read_csv(member, dtype=str, keep_default_na=False)
+                else:
+                    sheets[name] = pd.read_parquet(io.BytesIO(member.read()))
+    return sheets
@@ -0,0 +1,163 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from pld.spool import SpooledOutput
+
+
+def content_digest(data):
+    # Accept raw bytes or anything with getvalue()/read() (Streamlit UploadedFile, BytesIO, open file)
+    if hasattr(data, "getvalue"):
+        data = data.getvalue()
+    elif hasattr(data, "read"):
+        data.seek(0)
+        data = data.read()
+    return hashlib.sha256(data).hexdigest()
+
+
+def _size_of(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, tuple):
+        return sum(_size_of(v) for v in value)
+    if isinstance(value, SpooledOutput):
+        # A spooled PLD only counts while it is in memory, on disk it counts in _disk_size_of
+        return value.memory_size
+    return 0
+
+
+def _spools(value):
+    if isinstance(value, SpooledOutput):
+        return [value]
+    if isinstance(value, tuple):
+        return [spool for v in value for spool in _spools(v)]
+    return []
+
+
+def _disk_size_of(value):
+    return sum(spool.disk_size for spool in _spools(value))
+
+
+def _release(values, keep=None):
+    # The cache owns the spools it holds: an evicted entry's temp files are deleted now
+    # (except for spools also in `keep`, the entry that replaced it)
+    kept = {id(spool) for spool in _spools(keep)}
+    for value in values:
+        for spool in _spools(value):
+            if id(spool) not in kept:
+                spool.close()
+
+
+class LRUCache:
+    # Process-wide LRU keyed by content hash. Lives in an imported module so it survives
+    # Streamlit reruns and is shared by every session served by the same process.
+    # max_disk_bytes bounds the temp files of the SpooledOutputs in the entries (None: no
+    # bound); those are closed, deleting the files, when their entry is evicted or replaced.
+
+    def __init__(self, max_entries=64, max_bytes=512 * 1024 * 1024, max_disk_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._data = OrderedDict()
+        self._sizes = {}
+        self._bytes = 0
+        self._disk = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def _over(self):
+        return (
+            len(self._data) > self.max_entries
+            or self._bytes > self.max_bytes
+            or (self.max_disk_bytes is not None and self._disk > self.max_disk_bytes)
+        )
+
+    def _insert(self, key, value, evicted):
+        # With the lock held; replaced and evicted values go to `evicted`
+        size = (_size_of(value), _disk_size_of(value))
+        if key in self._data:
+            old_size = self._sizes.pop(key)
+            self._bytes -= old_size[0]
+            self._disk -= old_size[1]
+            evicted.append(self._data.pop(key))
+        self._data[key] = value
+        self._sizes[key] = size
+        self._bytes += size[0]
+        self._disk += size[1]
+        # Evict least recently used entries, but always keep the one just added
+        while len(self._data) > 1 and self._over():
+            old_key, old_value = self._data.popitem(last=False)
+            old_size = self._sizes.pop(old_key)
+            self._bytes -= old_size[0]
+            self._disk -= old_size[1]
+            evicted.append(old_value)
+            self.evictions += 1
+
+    def put(self, key, value):
+        evicted = []
+        with self._lock:
+            self._insert(key, value, evicted)
+        _release(evicted, keep=value)
+
+    def setdefault(self, key, value):
+        # Add value unless key is cached already; returns the cached value. Unlike put, an
+        # entry other sessions may be using (and so its spools) is never replaced
+        evicted = []
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                return self._data[key]
+            self._insert(key, value, evicted)
+        _release(evicted, keep=value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            evicted = list(self._data.values())
+            self._data.clear()
+            self._sizes.clear()
+            self._bytes = self._disk = 0
+            self.hits = self.misses = self.evictions = 0
+        _release(evicted)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "disk_bytes": self._disk,
+            }
+
+
+# Parsed sheets as (DataFrame, reader engine), keyed by
+# (sha256 of the uploaded bytes, sheet name, requested engine, read with a ReadSpec)
+parse_cache = LRUCache()
+
+# Finished PLDs as (PLD spool, changes-only spool, conversion results), keyed by the input
+# hashes, the PLD ID and the output format. The spools on disk are bounded by
+# PLD_SPOOL_DISK_MB (default 2048)
+workbook_cache = LRUCache(
+    max_entries=16,
+    max_bytes=256 * 1024 * 1024,
+    max_disk_bytes=int(os.environ.get("PLD_SPOOL_DISK_MB", 2048)) * 1024 * 1024,
+)
+
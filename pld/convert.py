@@ -0,0 +1,111 @@
+# One iGBot result file -> one PLD workbook, shared by the Streamlit page and the batch CLI
+import pandas as pd
+
+from pld.bundle import BUNDLE_WRITERS
+from pld.diff import diff_results
+from pld.instrument import stage
+from pld.integrity import check_references
+from pld.pipeline import ConversionContext, run_transforms, write_sheets
+from pld.sheets import TRANSFORMS
+from pld.writer import StreamingWorkbookWriter
+
+POID_COLUMNS = {"POID", "POName", "Keyword"}
+WRITERS = ("streaming", "pandas")
+# Output format -> (file name suffix, mime type); csv and parquet are bundles, see pld/bundle.py
+FORMATS = {
+    "xlsx": (".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": (".csv.zip", "application/zip"),
+    "parquet": (".parquet.zip", "application/zip"),
+}
+
+
+def extract_poid(filename):
+    filename = filename.replace(".xlsx", "")
+    parts = filename.split("-")
+    if len(parts) < 4:
+        return None
+    return parts[3].strip()
+
+
+def match_poid(poid_df, poid):
+    # (POID, PO name, master keyword) of the first matching row, or None
+    matched_row = poid_df[poid_df["POID"] == poid]
+    if matched_row.empty:
+        return None
+    return matched_row["POID"].iloc[0], matched_row["POName"].iloc[0], matched_row["Keyword"].iloc[0]
+
+
+def pld_file_name(pld_id, poid, format="xlsx"):
+    return f"PLD_{pld_id}_{poid}{FORMATS[format][0]}"
+
+
+def changes_file_name(pld_id, poid, format="xlsx"):
+    return f"PLD_{pld_id}_{poid}_changes{FORMATS[format][0]}"
+
+
+def expected_stages(previous=False):
+    # Stages convert() records: a transform and a write per sheet, the reference check
+    # and the workbook serialization, and with a previous PLD the diff and a second
+    # workbook. Sheets left out on a reported error skip their write.
+    stages = 2 * len(TRANSFORMS) + 2
+    return stages + len(TRANSFORMS) + 2 if previous else stages
+
+
+def write_pld(results, output, writer="streaming", format="xlsx", instrumentation=None):
+    # Write built PLD sheets to `output` (path or file object) as a workbook or a bundle
+    if format in BUNDLE_WRITERS:
+        book = BUNDLE_WRITERS[format](output)
+    elif writer == "streaming":
+        book = StreamingWorkbookWriter(output)
+    else:
+        book = pd.ExcelWriter(output, engine="xlsxwriter")
+    try:
+        write_sheets(book, TRANSFORMS, results, instrumentation)
+    finally:
+        with stage(instrumentation, "serialize", sheet="(workbook)"):
+            book.close()
+
+
+def convert(
+    po,
+    igbot_sheets,
+    prodef_sheets,
+    output,
+    max_workers=None,
+    writer="streaming",
+    instrumentation=None,
+    previous=None,
+    changes_output=None,
+    format="xlsx",
+):
+    # Run the sheet registry and write the workbook to `output` (path or file object).
+    # writer="streaming" writes row by row in constant memory, "pandas" uses DataFrame.to_excel.
+    # format="csv" / "parquet" writes a bundle of the same sheets instead of the workbook
+    # (see pld/bundle.py); the writer choice only applies to xlsx.
+    # With `previous` (sheets of the previous full PLD, see pld.diff.read_previous) a
+    # changes-only PLD is also written to `changes_output`; the full one stays the
+    # snapshot to diff the next revision against.
+    # Returns the context so callers can show its warnings, errors, ctx.changes and the
+    # reference check report ctx.integrity.
+    if writer not in WRITERS:
+        raise ValueError(f"Unknown writer {writer!r}, expected one of {WRITERS}")
+    if format not in FORMATS:
+        raise ValueError(f"Unknown format {format!r}, expected one of {tuple(FORMATS)}")
+    final_poid, po_name, master_keyword = po
+    ctx = ConversionContext(
+        poid=final_poid,
+        po_name=po_name,
+        master_keyword=master_keyword,
+        workbooks={"igbot": igbot_sheets, "prodef": prodef_sheets},
+        instrumentation=instrumentation,
+    )
+    results = run_transforms(ctx, TRANSFORMS, max_workers=max_workers)
+    with stage(instrumentation, "integrity", sheet="(workbook)"):
+        ctx.integrity = check_references(TRANSFORMS, results, ctx)
+    write_pld(results, output, writer, format, instrumentation)
+
+    if previous is not None:
+        with stage(instrumentation, "diff", sheet="(workbook)"):
+            changes = diff_results(TRANSFORMS, results, previous, ctx)
+        write_pld(changes, changes_output, writer, format, instrumentation)
+    return ctx
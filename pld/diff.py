@@ -0,0 +1,135 @@
+# Changes-only PLD: compare this conversion with the previous full PLD of the same POID
+# and keep only the rows the downstream loader has to apply.
+#
+# Rows are matched on each sheet's natural key (SheetTransform.key, plus an occurrence
+# number when a key repeats) and compared on a hash of all their other cells as cell text:
+# the previous PLD is read verbatim as strings, and the new rows are turned into the text
+# the writer stores (1.0 -> "1", NaN -> ""). Keys are matched on every row of both sheets;
+# NO_CHANGE rows are no-ops downstream, so they are only left out of what is emitted:
+#   new key                -> INSERT
+#   same key, other values -> UPDATE
+#   key no longer present  -> DELETE (the previous row)
+# where INSERT and UPDATE need a current row the full PLD applies, and DELETE a previous
+# one. A key still present in the current sheet, as NO_CHANGE too, is never deleted.
+# Sheets without a key (PO and the template sheets), or without an Action column (e.g. a
+# Rebuy-Association from a Prodef DMP without one), are written in full.
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+from pld.loader import load_sheets
+from pld.sheets import TRANSFORMS
+from pld.writer import cell_text, column_text
+
+CHANGE_ACTIONS = ("INSERT", "UPDATE", "DELETE")
+
+
+def _keyed(df, key, columns):
+    # One row per input row: canonical key columns, occurrence of that key, content hash
+    keyed = pd.DataFrame({f"key{i}": column_text(df[col]) for i, col in enumerate(key)})
+    keyed["occurrence"] = keyed.groupby(list(keyed.columns), sort=False).cumcount()
+    canon = pd.DataFrame({col: column_text(df[col]) for col in columns})
+    keyed["hash"] = pd.util.hash_pandas_object(canon, index=False).to_numpy()
+    keyed["row"] = np.arange(len(df))
+    return keyed
+
+
+def _applied(df, rows):
+    # Whether each of `rows` (positions in df, -1 for none) is a row the loader applies
+    if "Action" in df.columns:
+        applied = (df["Action"] != "NO_CHANGE").to_numpy()
+    else:
+        applied = np.ones(len(df), dtype=bool)
+    return (rows >= 0) & applied[np.maximum(rows, 0)] if len(df) else np.zeros(len(rows), dtype=bool)
+
+
+def diff_frame(current, previous, key):
+    # Changed rows of one sheet and {action: count, "unchanged": count}
+    columns = [col for col in current.columns if col != "Action"]
+    previous = previous.reindex(columns=current.columns)
+
+    on = [f"key{i}" for i in range(len(key))] + ["occurrence"]
+    merged = _keyed(current, key, columns).merge(
+        _keyed(previous, key, columns), on=on, how="outer", suffixes=("", "_previous"), indicator=True
+    )
+    current_applied = _applied(current, merged["row"].fillna(-1).to_numpy(dtype=int))
+    previous_applied = _applied(previous, merged["row_previous"].fillna(-1).to_numpy(dtype=int))
+    inserted = (merged["_merge"] == "left_only") & current_applied
+    updated = (merged["_merge"] == "both") & (merged["hash"] != merged["hash_previous"]) & current_applied
+    deleted = (merged["_merge"] == "right_only") & previous_applied
+    # Inserted and updated rows keep the current sheet's order, deleted ones go last
+    changed_rows = merged[inserted | updated].assign(Action=np.where(inserted, "INSERT", "UPDATE")[inserted | updated])
+    changed_rows = changed_rows.sort_values("row")
+    deleted_rows = np.sort(merged.loc[deleted, "row_previous"].to_numpy(dtype=int))
+
+    changed = current.iloc[changed_rows["row"].to_numpy(dtype=int)].copy()
+    changed["Action"] = changed_rows["Action"].to_numpy()
+    if len(deleted_rows):
+        deleted = previous.iloc[deleted_rows].copy()
+        deleted["Action"] = "DELETE"
+        # Previous rows were read as text; give numeric columns their numbers back
+        for col in columns:
+            if is_numeric_dtype(current[col]) and not is_bool_dtype(current[col]):
+                deleted[col] = pd.to_numeric(deleted[col], errors="coerce")
+        if len(changed):
+            # As object columns: the writer turns every value into the same cell either way,
+            # and pandas no longer has to guess dtypes from all-blank deleted columns
+            changed = pd.concat([changed.astype(object), deleted.astype(object)], ignore_index=True, sort=False)
+        else:
+            changed = deleted
+    changed = changed.reset_index(drop=True)
+
+    counts = {
+        "INSERT": int(inserted.sum()),
+        "UPDATE": int(updated.sum()),
+        "DELETE": len(deleted_rows),
+        "unchanged": len(current) - int(inserted.sum()) - int(updated.sum()),
+    }
+    return changed, counts
+
+
+def diff_results(transforms, results, previous, ctx):
+    # Results with every keyed sheet reduced to its changes; ctx.changes gets the counts
+    changes = {}
+    diffed = dict(results)
+    for t in transforms:
+        current = results.get(t.name)
+        if not t.key or not isinstance(current, pd.DataFrame):
+            continue
+        if "Action" not in current.columns:
+            # Nothing to tell the loader per row (a Prodef sheet without Action): in full
+            continue
+        missing = [col for col in t.key if col not in current.columns]
+        if missing:
+            ctx.warning(f"'{t.name}' has no {', '.join(missing)} column; written in full instead of as changes.")
+            continue
+        previous_df = previous[t.name] if t.name in previous else pd.DataFrame(columns=current.columns)
+        diffed[t.name], changes[t.name] = diff_frame(current, previous_df, t.key)
+    ctx.changes = changes
+    return diffed
+
+
+def previous_sheets():
+    return ["PO"] + [t.name for t in TRANSFORMS if t.key]
+
+
+def read_previous(upload, poid, engine=None):
+    # Sheets of the previous full PLD as cell text (blank cells as ""), checked to be a
+    # full PLD of the same POID
+    sheets = load_sheets(upload, previous_sheets(), cache=None, engine=engine, dtype=str, keep_default_na=False)
+    if "PO" not in sheets or "PO ID" not in sheets["PO"].columns or sheets["PO"].empty:
+        raise ValueError("The previous PLD has no PO sheet with a PO ID.")
+    previous_poid = sheets["PO"]["PO ID"].iloc[0].strip()
+    if previous_poid != cell_text(poid).strip():
+        raise ValueError(f"The previous PLD is for POID '{previous_poid}', not '{poid}'.")
+    for name, df in sheets.items():
+        if "Action" in df.columns and df["Action"].isin(["UPDATE", "DELETE"]).any():
+            raise ValueError(
+                f"The previous PLD is a changes-only PLD ('{name}' has UPDATE/DELETE rows); upload the full PLD."
+            )
+    return sheets
+
+
+def changes_frame(changes):
+    columns = ["sheet", *CHANGE_ACTIONS, "unchanged"]
+    return pd.DataFrame([{"sheet": name, **counts} for name, counts in changes.items()], columns=columns)
@@ -0,0 +1,177 @@
+# Per-stage timing for a conversion: wall time, rows in/out and memory. Every finished
+# stage is also logged as one JSON line on the "pld.stages" logger. Memory per stage:
+#   rss_delta_mb   change of the process' current RSS over the stage (Linux only): what
+#                  the stage left resident, negative when it freed more than it kept. While
+#                  sheets are built in parallel it includes the other sheets' growth.
+#   peak_alloc_mb  with trace_memory: the most memory the stage had allocated at once
+#                  (tracemalloc, which numpy and pandas report to). Slows the conversion
+#                  down, and makes run_transforms build one sheet at a time, so every
+#                  stage's peak is its own (tracemalloc is process-wide: conversions traced
+#                  at the same time by other sessions still add to each other's peaks).
+import io
+import json
+import logging
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+
+logger = logging.getLogger("pld.stages")
+
+
+def enable_json_logging(stream=None):
+    # Print stage records as bare JSON lines (once per process)
+    if not logger.handlers:
+        handler = logging.StreamHandler(stream or sys.stderr)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+
+def rss_mb():
+    # Current resident memory of this process, None where /proc is not available
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+
+
+def _start_tracing():
+    # tracemalloc stays on while any traced stage runs, in any thread (and is left alone
+    # when something else started it)
+    global _tracing_users
+    with _tracing_lock:
+        if _tracing_users or not tracemalloc.is_tracing():
+            if not _tracing_users:
+                tracemalloc.start()
+            _tracing_users += 1
+
+
+def _stop_tracing():
+    global _tracing_users
+    with _tracing_lock:
+        if _tracing_users:
+            _tracing_users -= 1
+            if not _tracing_users:
+                tracemalloc.stop()
+
+
+def row_count(value):
+    if value is None:
+        return None
+    if hasattr(value, "rows"):  # SheetTemplate
+        return len(value.rows)
+    return len(value)
+
+
+class Instrumentation:
+    def __init__(self, run_id=None, trace_memory=False):
+        self.run_id = run_id or uuid.uuid4().hex[:8]
+        self.trace_memory = trace_memory
+        self.stages = []
+        # fn(record) called as each stage finishes, in the thread that ran it
+        self.listeners = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name, sheet=None, rows_in=None):
+        # Yields the record; set record["rows_out"] inside the block (other keys set there
+        # only go to the JSON log)
+        record = {"stage": name, "sheet": sheet, "rows_in": rows_in, "rows_out": None, "status": "ok"}
+        # Stages do not nest, so each one can reset the tracemalloc peak
+        if self.trace_memory:
+            _start_tracing()
+            traced_before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        rss_before = rss_mb()
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException:
+            record["status"] = "error"
+            raise
+        finally:
+            record["seconds"] = round(time.perf_counter() - start, 4)
+            rss_after = rss_mb()
+            record["rss_delta_mb"] = None if rss_before is None else round(rss_after - rss_before, 1)
+            record["peak_alloc_mb"] = None
+            if self.trace_memory:
+                peak = tracemalloc.get_traced_memory()[1] - traced_before
+                record["peak_alloc_mb"] = round(max(0, peak) / (1024 * 1024), 1)
+                _stop_tracing()
+            with self._lock:
+                self.stages.append(record)
+            logger.info(json.dumps({"event": "pld.stage", "run": self.run_id, **record}))
+            for listener in self.listeners:
+                listener(record)
+
+    def to_frame(self):
+        return stages_frame(self.stages)
+
+    def total_seconds(self):
+        return round(sum(r["seconds"] for r in self.stages), 4)
+
+
+class Progress:
+    # Share of a conversion's stages that have finished; add it to
+    # Instrumentation.listeners. `expected` is how many stages the conversion records.
+    def __init__(self, expected):
+        self.expected = max(1, expected)
+        self.finished = 0
+        self.last = None
+        self._lock = threading.Lock()
+
+    def __call__(self, record):
+        with self._lock:
+            self.finished += 1
+            self.last = record
+
+    @property
+    def fraction(self):
+        return min(1.0, self.finished / self.expected)
+
+    def describe(self):
+        if self.last is None:
+            return "Starting"
+        last = self.last
+        return f"{last['stage']} {last['sheet'] or ''}".strip()
+
+
+def stages_frame(stages):
+    columns = ["stage", "sheet", "seconds", "rows_in", "rows_out", "rss_delta_mb", "peak_alloc_mb", "status"]
+    df = pd.DataFrame(stages, columns=columns)
+    df[["rows_in", "rows_out"]] = df[["rows_in", "rows_out"]].astype("Int64")
+    return df
+
+
+def stage(instrumentation, name, sheet=None, rows_in=None):
+    # instrumentation.stage(...) or a no-op when the caller is not instrumenting
+    if instrumentation is None:
+        return nullcontext({})
+    return instrumentation.stage(name, sheet=sheet, rows_in=rows_in)
+
+
+def profile_bytes(profiler):
+    # Same content as pstats dump_stats(), loadable with pstats.Stats / snakeviz
+    profiler.create_stats()
+    return marshal.dumps(profiler.stats)
+
+
+def profile_summary(profiler, limit=25):
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(limit)
+    return out.getvalue()
@@ -0,0 +1,131 @@
+# Cross-sheet referential integrity of a built PLD: every column a transform declares in
+# SheetTransform.references must only hold values of the key it points to, e.g. each
+# Ruleset ShortName of PCRF must be a ruleset of Rules-Header. Dangling references are
+# otherwise only found when the downstream system rejects the load.
+#
+# Each key is indexed once (a hash index of its distinct values) and every referencing
+# column is checked on its distinct values only (pd.factorize, then one vectorized index
+# lookup), so the check costs about one factorize pass per column even at hundreds of
+# thousands of rows. Values are compared as the cell text the writer stores; blank and
+# whitespace-only cells are not references.
+import numpy as np
+import pandas as pd
+from pandas.api.types import infer_dtype
+
+from pld.writer import column_text
+
+# Key name -> (output sheet, column) holding the valid values
+KEYS = {
+    "ruleset": ("Rules-Header", "Ruleset ShortName"),
+    "poid": ("PO", "PO ID"),
+}
+EXAMPLES = 5
+
+REPORT_COLUMNS = [
+    "sheet",
+    "column",
+    "references",
+    "rows",
+    "distinct",
+    "dangling rows",
+    "dangling values",
+    "duplicated values",
+    "examples",
+]
+
+
+def _distinct_text(s):
+    # (codes, cell text of each distinct value); missing values get code -1
+    codes, uniques = pd.factorize(s)
+    if uniques.dtype == object and infer_dtype(uniques) == "string":
+        return codes, uniques
+    return codes, column_text(pd.Series(uniques))
+
+
+def _blank(text):
+    # "" or whitespace only; np.char works on the whole array at once
+    text = np.asarray(text, dtype=str)
+    return (text == "") | np.char.isspace(text)
+
+
+def _key_index(df, column):
+    # (hash index of the distinct non-blank values, first few duplicated values)
+    codes, text = _distinct_text(df[column])
+    filled = ~_blank(text)
+    counts = np.bincount(codes[codes >= 0], minlength=len(text))
+    duplicated = text[filled & (counts > 1)]
+    return pd.Index(text[filled]), [str(v) for v in duplicated[:EXAMPLES]], len(duplicated)
+
+
+def _dangling(codes, text, index):
+    # Distinct values not in the index, and the number of rows holding them. Only values
+    # the lookup misses are tested for blanks, so clean columns never go through str.strip
+    missing = index.get_indexer(text) == -1
+    if missing.any():
+        candidates = np.flatnonzero(missing)
+        missing[candidates[_blank(text[candidates])]] = False
+    # Code -1 (missing cell) picks the appended False
+    rows = int(np.count_nonzero(np.append(missing, False)[codes]))
+    return text[missing], rows
+
+
+def check_references(transforms, results, ctx=None):
+    # One report row per key (duplicates) and per referencing column (dangling values);
+    # problems also go to ctx as warnings
+    report = []
+    indexes = {}
+    for name, (sheet, column) in KEYS.items():
+        df = results.get(sheet)
+        if not isinstance(df, pd.DataFrame) or column not in df.columns:
+            continue
+        indexes[name], duplicated, duplicate_count = _key_index(df, column)
+        report.append(
+            {
+                "sheet": sheet,
+                "column": column,
+                "references": "(key)",
+                "rows": len(df),
+                "distinct": len(indexes[name]),
+                "dangling rows": 0,
+                "dangling values": 0,
+                "duplicated values": duplicate_count,
+                "examples": ", ".join(duplicated),
+            }
+        )
+        if duplicated and ctx is not None:
+            ctx.warning(f"'{sheet}' has {duplicate_count} duplicated {column} values, e.g. {', '.join(duplicated)}")
+
+    for t in transforms:
+        df = results.get(t.name)
+        if not isinstance(df, pd.DataFrame):
+            continue
+        for column, name in t.references.items():
+            if column not in df.columns or name not in indexes:
+                continue
+            key_sheet, key_column = KEYS[name]
+            codes, text = _distinct_text(df[column])
+            dangling, dangling_rows = _dangling(codes, text, indexes[name])
+            examples = ", ".join(str(v) for v in dangling[:EXAMPLES])
+            report.append(
+                {
+                    "sheet": t.name,
+                    "column": column,
+                    "references": f"{key_sheet} / {key_column}",
+                    "rows": len(df),
+                    "distinct": len(text),
+                    "dangling rows": dangling_rows,
+                    "dangling values": len(dangling),
+                    "duplicated values": 0,
+                    "examples": examples,
+                }
+            )
+            if dangling_rows and ctx is not None:
+                ctx.warning(
+                    f"'{t.name}' column '{column}': {dangling_rows} rows refer to {len(dangling)} values "
+                    f"not in '{key_sheet}' {key_column}, e.g. {examples}"
+                )
+    return report
+
+
+def integrity_frame(report):
+    return pd.DataFrame(report, columns=REPORT_COLUMNS)
@@ -0,0 +1,230 @@
+import importlib.util
+import logging
+import os
+import re
+import zipfile
+from dataclasses import dataclass, field
+from io import BytesIO
+
+import pandas as pd
+
+from pld.cache import content_digest, parse_cache
+from pld.normalize import to_int64
+
+logger = logging.getLogger("pld.loader")
+
+# Reader engines, fastest first. calamine (Rust, optional python-calamine package) is
+# several times faster than openpyxl on large workbooks; openpyxl is always available
+# and is the fallback for anything calamine cannot read. pandas' openpyxl reader already
+# streams rows in read-only/values-only mode, so there is no separate engine for that.
+ENGINES = ("calamine", "openpyxl")
+
+# "auto" picks the fastest installed engine; PLD_EXCEL_ENGINE pins one for the process
+DEFAULT_ENGINE = os.environ.get("PLD_EXCEL_ENGINE", "auto")
+
+
+def available_engines():
+    return [name for name in ENGINES if name == "openpyxl" or importlib.util.find_spec("python_calamine")]
+
+
+def resolve_engine(engine=None):
+    engine = engine or DEFAULT_ENGINE
+    if engine == "auto":
+        return available_engines()[0]
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown Excel reader engine '{engine}', expected one of: auto, {', '.join(ENGINES)}")
+    if engine not in available_engines():
+        logger.warning("Excel reader engine %s is not installed, using openpyxl", engine)
+        return "openpyxl"
+    return engine
+
+
+@dataclass
+class ReadSpec:
+    # How one sheet is loaded:
+    #   usecols: columns to keep (None: all of them; listed columns missing from the
+    #            sheet are not an error, the schema check reports them)
+    #   dtypes:  column -> "category" for enumerated fields stored once per distinct value,
+    #            or "Int64" for integer columns (non-numbers become <NA>, as
+    #            pld.normalize.to_int64 does; a column with fractional numbers is left as
+    #            parsed, so the sheet's transform reports it like without a read spec);
+    #            applied right after parsing, so the parse cache holds the compact frames
+    usecols: tuple = None
+    dtypes: dict = field(default_factory=dict)
+
+    def parse_kwargs(self):
+        if self.usecols is None:
+            return {}
+        return {"usecols": lambda col: col in self.usecols}
+
+    def apply(self, df):
+        # Also safe on frames it was already applied to
+        for col, dtype in self.dtypes.items():
+            if col not in df.columns:
+                continue
+            if dtype == "category":
+                df[col] = df[col].astype("category")
+            elif dtype == "Int64":
+                try:
+                    df[col] = to_int64(df[col])
+                except (TypeError, ValueError):
+                    pass
+            else:
+                raise ValueError(f"Unknown read dtype '{dtype}' for column '{col}'")
+        return df
+
+
+class Sheets(dict):
+    # Sheet name -> DataFrame. A sheet that is not in the workbook raises the same
+    # error pd.read_excel would, at the point where the transform asks for it.
+    def __init__(self, frames=(), engines=None):
+        super().__init__(frames)
+        # Sheet name -> reader engine that parsed it
+        self.engines = dict(engines or {})
+
+    def __missing__(self, sheet_name):
+        raise ValueError(f"Worksheet named '{sheet_name}' not found")
+
+    def copy(self):
+        # Transforms edit columns in place, so every conversion gets its own frames
+        return Sheets({name: df.copy() for name, df in self.items()}, self.engines)
+
+
+# A whitespace-only string without xml:space="preserve" (openpyxl writes them that way).
+# openpyxl keeps " ", calamine reads it as an empty cell, which changes the PLD output.
+_BARE_WHITESPACE = re.compile(rb"t>\s+</(?:\w+:)?t>")  # literal prefix keeps the scan fast
+
+
+def _calamine_safe(data):
+    # Scan the shared strings and sheet XML (no parsing, just the raw bytes) for cells
+    # calamine would read differently from openpyxl
+    try:
+        with zipfile.ZipFile(BytesIO(data)) as archive:
+            for name in archive.namelist():
+                if name == "xl/sharedStrings.xml" or name.startswith("xl/worksheets/"):
+                    with archive.open(name) as part:
+                        if _BARE_WHITESPACE.search(part.read()):
+                            return False
+    except zipfile.BadZipFile:
+        return False
+    return True
+
+
+class _Workbook:
+    # One open workbook per engine, opened on first use. Sheets the preferred engine
+    # cannot open or parse are read again with openpyxl, so a fast engine never turns
+    # a readable upload into an error.
+    def __init__(self, data, engine):
+        self.data = data
+        self.engine = engine
+        self._books = {}
+        if engine == "calamine" and not _calamine_safe(data):
+            logger.info("Workbook has whitespace-only strings calamine would drop, reading it with openpyxl")
+            self.engine = "openpyxl"
+
+    def _book(self, engine):
+        if engine not in self._books:
+            self._books[engine] = pd.ExcelFile(BytesIO(self.data), engine=engine)
+        return self._books[engine]
+
+    def _engines(self):
+        return [self.engine] if self.engine == "openpyxl" else [self.engine, "openpyxl"]
+
+    def sheet_names(self):
+        for engine in self._engines():
+            try:
+                return self._book(engine).sheet_names
+            except Exception as e:
+                if engine == "openpyxl":
+                    raise
+                logger.warning("%s could not open the workbook (%s), falling back to openpyxl", engine, e)
+                self.engine = "openpyxl"
+
+    def parse(self, sheet_name, **kwargs):
+        # Returns (DataFrame, engine that read it)
+        for engine in self._engines():
+            try:
+                return self._book(engine).parse(sheet_name, **kwargs), engine
+            except Exception as e:
+                if engine == "openpyxl":
+                    raise
+                logger.warning("%s could not read sheet %s (%s), falling back to openpyxl", engine, sheet_name, e)
+
+    def close(self):
+        for book in self._books.values():
+            book.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _freeze(value):
+    # Hashable, order-independent form of read options for parse cache keys. Raises
+    # TypeError for values that have none (the read then skips the cache)
+    if isinstance(value, dict):
+        return ("dict", tuple(sorted(((repr(k), _freeze(v)) for k, v in value.items()), key=lambda kv: kv[0])))
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__, tuple(_freeze(v) for v in value))
+    if isinstance(value, (set, frozenset)):
+        return ("set", frozenset(_freeze(v) for v in value))
+    if isinstance(value, ReadSpec):
+        return ("spec", _freeze(value.usecols), _freeze(value.dtypes))
+    hash(value)
+    return value
+
+
+def load_sheets(upload, sheet_names, digest=None, cache=parse_cache, engine=None, specs=None, **kwargs):
+    # Open the workbook once and parse only the requested sheets, instead of one
+    # pd.read_excel per sheet re-reading the zip, shared strings and styles.
+    # engine: "auto" (default, see DEFAULT_ENGINE), "calamine" or "openpyxl";
+    # Sheets.engines records which engine actually read each sheet.
+    # specs: sheet name -> ReadSpec for the sheets to prune and type at read time.
+    data = upload.getvalue() if hasattr(upload, "getvalue") else upload
+    if digest is None:
+        digest = content_digest(data)
+    engine = resolve_engine(engine)
+    specs = specs or {}
+
+    # Frames are cached per read options: the sheet's spec and any pd.read_excel kwargs
+    # (nrows, dtype, ...). Options without a hashable form are read without the cache
+    try:
+        options = _freeze(kwargs)
+        keys = {name: (digest, name, engine, _freeze(specs.get(name)), options) for name in sheet_names}
+    except TypeError:
+        cache = None
+
+    sheets = Sheets()
+    pending = []
+    for name in sheet_names:
+        cached = cache.get(keys[name]) if cache is not None else None
+        if cached is None:
+            pending.append(name)
+        else:
+            sheets[name], sheets.engines[name] = cached
+
+    if pending:
+        with _Workbook(data, engine) as book:
+            available = set(book.sheet_names())
+            for name in pending:
+                if name not in available:
+                    continue
+                spec = specs.get(name)
+                if spec is None:
+                    df, used = book.parse(name, **kwargs)
+                else:
+                    df, used = book.parse(name, **spec.parse_kwargs(), **kwargs)
+                    df = spec.apply(df)
+                if cache is not None:
+                    cache.put(keys[name], (df, used))
+                sheets[name], sheets.engines[name] = df, used
+
+    # Hand out copies rather than the cached frames
+    return sheets.copy()
+
+
+def read_sheet(upload, sheet_name, **kwargs):
+    # A single sheet through the same engine selection, fallback and parse cache
+    return load_sheets(upload, [sheet_name], **kwargs)[sheet_name]
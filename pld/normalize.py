@@ -0,0 +1,124 @@
+# Column normalizations used by the sheet transforms (pld/sheets.py).
+# Each takes a Series read from an input sheet and returns the cleaned Series.
+#
+# All of them are vectorized: string columns are normalized once per distinct value
+# (pd.factorize + take), numeric columns go through numpy, and no normalizer calls
+# back into Python for every row.
+import numpy as np
+import pandas as pd
+from pandas.api.types import infer_dtype, is_bool_dtype, is_integer_dtype, is_numeric_dtype
+
+
+def _is_category(s):
+    return isinstance(s.dtype, pd.CategoricalDtype)
+
+
+def _text(s):
+    # Column as str values with missing values kept as NaN
+    if s.dtype == object and infer_dtype(s, skipna=True) in ("string", "empty"):
+        return s
+    if _is_category(s):
+        # _distinct turns the categories into text
+        return s
+    return s.astype(str).where(s.notna())
+
+
+def _distinct(s, fn, na_value):
+    # Run fn on the distinct values only and broadcast the result back by position;
+    # missing values get na_value
+    if _is_category(s):
+        # Categories are the distinct values already; the result stays categorical
+        categories = s.cat.categories
+        if infer_dtype(categories) not in ("string", "empty"):
+            categories = categories.astype(str)
+        result = np.append(np.asarray(fn(pd.Series(categories, dtype=object)), dtype=object), na_value)
+        result_codes, categories = pd.factorize(result)
+        # code -1 (missing) picks the last element, na_value
+        return pd.Series(
+            pd.Categorical.from_codes(result_codes[s.cat.codes.to_numpy()], categories),
+            index=s.index,
+            name=s.name,
+        )
+    codes, uniques = pd.factorize(s)
+    result = np.asarray(fn(pd.Series(uniques, dtype=object)), dtype=object)
+    result = np.append(result, na_value)  # code -1 (missing) picks the last element
+    return pd.Series(result[codes], index=s.index, name=s.name)
+
+
+def _is_number(s):
+    return is_numeric_dtype(s) and not is_bool_dtype(s)
+
+
+def strip_str(s):
+    return _distinct(_text(s), lambda u: u.str.strip(), "nan")
+
+
+def clean_str(s):
+    # Convert to string, strip whitespace and turn NaN / "nan" into empty strings
+    return _distinct(_text(s), lambda u: u.str.strip().replace("nan", ""), "")
+
+
+def upper_str(s):
+    # Missing values become "NAN", as str(NaN).upper() always produced here
+    return _distinct(_text(s), lambda u: u.str.strip().str.upper(), "NAN")
+
+
+def lower_str(s):
+    return s.str.lower()
+
+
+def as_str(s):
+    return s.astype(str)
+
+
+def to_int64(s):
+    return pd.to_numeric(s, errors="coerce").astype("Int64")
+
+
+def version_int(s):
+    # Missing or non-numeric versions become 0
+    if _is_number(s):
+        return s.fillna(0).astype(int)
+    return pd.to_numeric(clean_str(s), errors="coerce").fillna(0).astype(int)
+
+
+def int_str(s):
+    # Integer-like values as plain digit strings: 1234.0 / "1234.0" / " 1234 " -> "1234";
+    # other text is only stripped, missing values become ""
+    if is_integer_dtype(s) and not is_bool_dtype(s):
+        return s.astype(str).astype(object)
+    if _is_number(s):
+        # Plain float column: truncate numerically, as long as every value would have printed
+        # as digits (no sign, no exponent); otherwise fall through to the text path
+        plain = (s == 0) | ((s >= 1e-4) & (s < 1e16))
+        if (plain | s.isna()).all():
+            out = pd.Series("", index=s.index, name=s.name, dtype=object)
+            out[plain] = np.trunc(s[plain]).astype("int64").astype(str)
+            return out
+
+    def whole(u):
+        u = u.str.strip().replace(["nan", "NaN"], "")
+        numeric = u.str.replace(".", "", regex=False).str.isdigit()
+        digits = u.str.replace(r"\..*", "", regex=True).str.lstrip("0").replace("", "0")
+        return u.where(~numeric, digits)
+
+    return _distinct(_text(s), whole, "")
+
+
+def thousands_int(s, round_decimals=False):
+    # Thousands-separated numbers as Int64: "1,000.50" -> 1000 (decimals truncated,
+    # or rounded half-to-even with round_decimals=True); unparseable values become <NA>
+    if _is_number(s):
+        values = s.astype(float)
+    else:
+        values = pd.to_numeric(
+            _distinct(_text(s), lambda u: u.str.replace(",", "", regex=False).str.strip(), np.nan),
+            errors="coerce",
+        )
+    values = np.round(values) if round_decimals else np.trunc(values)
+    return values.astype("Int64")
+
+
+def exit_value(s):
+    # "1" for rows with a Ruleset ShortName, "" otherwise
+    return _distinct(_text(s), lambda u: np.where(u.str.strip() != "", "1", ""), "")
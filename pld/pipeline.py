@@ -0,0 +1,175 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from pld.instrument import Instrumentation, row_count, stage
+from pld.loader import Sheets
+from pld.writer import SheetTemplate
+
+
+@dataclass
+class SheetTransform:
+    # One output sheet of the PLD workbook.
+    #   source:        (workbook, sheet) the transform starts from, e.g. ("igbot", "PCRF"); None for built sheets
+    #   extra_sources: other input sheets the build step reads through ctx.input()
+    #   normalize:     column -> normalizer, applied in order before build
+    #   defaults:      column -> value used when a normalized column is missing from the input;
+    #                  columns without a default are skipped when missing unless listed in `required`
+    #   required:      normalized columns whose absence is an error (KeyError, as before)
+    #   action:        constant written to the "Action" column after normalizing
+    #   build:         fn(df, ctx) -> DataFrame for the sheet-specific logic (df is None without a source)
+    #   template:      prebuilt SheetTemplate for sheets whose content never changes
+    #   depends_on:    output sheets whose results build reads from ctx.results
+    #   on_error:      "raise" stops the conversion, "report" logs the error and leaves the sheet out
+    #   key:           natural key of a row, for the changes-only PLD (pld/diff.py); sheets
+    #                  without one are always written in full
+    #   references:    column -> key it refers to ("ruleset", "poid"), checked by pld/integrity.py
+    name: str
+    source: tuple = None
+    extra_sources: tuple = ()
+    normalize: dict = field(default_factory=dict)
+    defaults: dict = field(default_factory=dict)
+    required: tuple = ()
+    action: str = None
+    build: object = None
+    template: SheetTemplate = None
+    depends_on: tuple = ()
+    on_error: str = "raise"
+    key: tuple = ()
+    references: dict = field(default_factory=dict)
+
+    @property
+    def inputs(self):
+        return ((self.source,) if self.source else ()) + tuple(self.extra_sources)
+
+    def run(self, ctx):
+        if self.template is not None:
+            return self.template
+        df = ctx.input(*self.source) if self.source else None
+        for col, fn in self.normalize.items():
+            if col in df.columns:
+                df[col] = fn(df[col])
+            elif col in self.defaults:
+                df[col] = self.defaults[col]
+            elif col in self.required:
+                raise KeyError(col)
+        if self.action is not None:
+            # One category and a byte per row instead of a string reference per row
+            df["Action"] = pd.Categorical.from_codes(np.zeros(len(df), dtype=np.int8), [self.action])
+        if self.build is not None:
+            df = self.build(df, ctx)
+        return df
+
+
+@dataclass
+class ConversionContext:
+    # Everything a transform may read: the matched PO row, the loaded input sheets
+    # per workbook ("igbot", "prodef"), and results of the transforms it depends on.
+    # Stage timings go to `instrumentation` when one is attached.
+    poid: str
+    po_name: str = ""
+    master_keyword: str = ""
+    workbooks: dict = field(default_factory=dict)
+    results: dict = field(default_factory=dict)
+    messages: list = field(default_factory=list)
+    instrumentation: Instrumentation = None
+    changes: dict = None  # sheet -> action counts, when a changes-only PLD was built
+    integrity: list = None  # per-column reference check results, see pld/integrity.py
+
+    def input(self, workbook, sheet_name):
+        return self.workbooks.get(workbook, Sheets())[sheet_name]
+
+    def warning(self, message):
+        self.messages.append(("warning", message))
+
+    def error(self, message):
+        self.messages.append(("error", message))
+
+
+def _rows_in(transform, ctx):
+    if transform.source is None:
+        return None
+    workbook, sheet_name = transform.source
+    df = ctx.workbooks.get(workbook, {}).get(sheet_name)
+    return None if df is None else len(df)
+
+
+def _run_one(transform, ctx):
+    with stage(ctx.instrumentation, "transform", sheet=transform.name, rows_in=_rows_in(transform, ctx)) as record:
+        try:
+            result = transform.run(ctx)
+        except Exception as e:
+            if transform.on_error == "report":
+                ctx.error(f"Error processing '{transform.name}': {e}")
+                record["status"] = "error"
+                return None
+            raise
+        record["rows_out"] = row_count(result)
+        return result
+
+
+def run_transforms(ctx, transforms, max_workers=None):
+    # Run every transform as soon as the ones it depends on have finished; independent
+    # sheets run concurrently on a thread pool. Returns {sheet name: DataFrame or None}.
+    names = {t.name for t in transforms}
+    for t in transforms:
+        unknown = set(t.depends_on) - names
+        if unknown:
+            raise ValueError(f"'{t.name}' depends on unknown sheets: {sorted(unknown)}")
+
+    if max_workers is None:
+        max_workers = min(8, os.cpu_count() or 1)
+    if ctx.instrumentation is not None and ctx.instrumentation.trace_memory:
+        # Per-stage memory peaks are only the stage's own when nothing runs beside it
+        max_workers = 1
+
+    pending = list(transforms)
+    if max_workers == 1:
+        # Sequential, in the calling thread (batch workers, cProfile captures, memory tracing)
+        while pending:
+            ready = [t for t in pending if all(d in ctx.results for d in t.depends_on)]
+            if not ready:
+                raise ValueError(f"Circular sheet dependencies: {[t.name for t in pending]}")
+            for t in ready:
+                pending.remove(t)
+                ctx.results[t.name] = _run_one(t, ctx)
+        return ctx.results
+
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            ready = [t for t in pending if all(d in ctx.results for d in t.depends_on)]
+            if not ready and not running:
+                raise ValueError(f"Circular sheet dependencies: {[t.name for t in pending]}")
+            for t in ready:
+                pending.remove(t)
+                running[pool.submit(_run_one, t, ctx)] = t
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                t = running.pop(future)
+                # Re-raise the first failure; the pool waits for the other sheets on exit
+                ctx.results[t.name] = future.result()
+    return ctx.results
+
+
+def write_sheets(writer, transforms, results, instrumentation=None):
+    # Write in registry order, which is the sheet order of the PLD workbook, to a
+    # pd.ExcelWriter or anything with write_frame / write_template (StreamingWorkbookWriter,
+    # the CSV and Parquet bundle writers)
+    for t in transforms:
+        result = results.get(t.name)
+        if result is None:
+            continue
+        with stage(instrumentation, "write", sheet=t.name, rows_in=row_count(result)) as record:
+            if isinstance(writer, pd.ExcelWriter):
+                if isinstance(result, SheetTemplate):
+                    result = result.to_frame()
+                result.to_excel(writer, sheet_name=t.name, index=False)
+            elif isinstance(result, SheetTemplate):
+                writer.write_template(t.name, result)
+            else:
+                writer.write_frame(t.name, result)
+            record["rows_out"] = row_count(result)
@@ -0,0 +1,285 @@
+# On-disk store of the reference workbooks (POID matching file, Prodef DMP) as Parquet.
+#
+#   python -m pld.refstore import --poid Roaming_SC_Completion_v1.xlsx --prodef Prodef_DMP.xlsx
+#   python -m pld.refstore show
+#
+# Each import is a version directory named after the sha256 of the xlsx it came from
+# (the same digest the parse and workbook caches use), holding one Parquet file per
+# sheet plus manifest.json (source file name, import time, sheets, column labels).
+# CURRENT points at the version conversions use; importing a file that is already
+# current is a no-op, so re-uploading the same workbook costs one hash.
+#
+# The POID file also gets poid_index.parquet (first row per POID), so matching a POID
+# is an index lookup instead of a scan of the whole sheet.
+#
+# Parquet needs one type per column, while read_excel leaves columns such as
+# "Initial Value" with ints and strings mixed. Those columns are stored as JSON text and
+# decoded on load, so the frames read back are the ones read_excel produced.
+import argparse
+import datetime
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import infer_dtype
+
+from pld.cache import content_digest
+from pld.loader import Sheets, load_sheets
+from pld.schema import check, read_specs
+from pld.sheets import PRODEF_SHEETS
+
+DEFAULT_STORE = os.environ.get("PLD_REFERENCE_DIR", "reference_store")
+# Reference kind -> sheets kept from its workbook
+KINDS = {"poid": ["Sheet1"], "prodef": PRODEF_SHEETS}
+# Versions kept per kind, CURRENT included
+KEEP_VERSIONS = 3
+FORMAT = 1
+
+_lock = threading.Lock()
+
+
+def _encode(value):
+    if isinstance(value, datetime.datetime):
+        return json.dumps({"datetime": value.isoformat()})
+    if isinstance(value, datetime.date):
+        return json.dumps({"date": value.isoformat()})
+    if isinstance(value, datetime.time):
+        return json.dumps({"time": value.isoformat()})
+    if isinstance(value, np.generic):
+        value = value.item()
+    return json.dumps(value)
+
+
+def _decode(text):
+    value = json.loads(text)
+    if isinstance(value, dict):
+        (kind, iso), = value.items()
+        if kind == "datetime":
+            return pd.Timestamp(iso)
+        if kind == "date":
+            return datetime.date.fromisoformat(iso)
+        return datetime.time.fromisoformat(iso)
+    return np.nan if value is None else value
+
+
+def _by_distinct(s, fn):
+    codes, uniques = pd.factorize(s, use_na_sentinel=False)
+    return pd.Series(np.array([fn(v) for v in uniques], dtype=object)[codes], index=s.index)
+
+
+def _write_frame(df, path):
+    # Positional column names on disk (labels may be ints or repeat after mangling in
+    # other tools); the real labels and the JSON-encoded columns go to the manifest
+    stored = pd.DataFrame(index=pd.RangeIndex(len(df)))
+    encoded = []
+    for i, col in enumerate(df.columns):
+        s = df.iloc[:, i].reset_index(drop=True)
+        if s.dtype == object and infer_dtype(s, skipna=True) not in ("string", "empty"):
+            s = _by_distinct(s, _encode)
+            encoded.append(i)
+        stored[f"c{i}"] = s
+    stored.to_parquet(path, index=False)
+    return {"columns": list(df.columns), "encoded": encoded, "rows": len(df)}
+
+
+def _read_frame(path, meta):
+    stored = pd.read_parquet(path, memory_map=True)
+    df = pd.DataFrame(index=pd.RangeIndex(len(stored)))
+    for i, label in enumerate(meta["columns"]):
+        s = stored[f"c{i}"]
+        if i in meta["encoded"]:
+            s = _by_distinct(s, _decode)
+        elif s.dtype == object:
+            # Arrow nulls come back as None; read_excel gives NaN
+            s = s.where(s.notna(), np.nan)
+        df[label] = s
+    return df
+
+
+class Reference:
+    # One imported version of a reference workbook
+    def __init__(self, path, manifest):
+        self.path = path
+        self.manifest = manifest
+
+    @property
+    def kind(self):
+        return self.manifest["kind"]
+
+    @property
+    def version(self):
+        return self.manifest["version"]
+
+    @property
+    def source(self):
+        return self.manifest["source"]
+
+    @property
+    def imported_at(self):
+        return self.manifest["imported_at"]
+
+    def sheets(self):
+        # Fresh frames on every call; transforms may edit them in place. Categorical and
+        # Int64 columns come back from Parquet as they were stored; the read specs are
+        # applied again for versions imported before they existed.
+        specs = read_specs(self.kind)
+        sheets = Sheets()
+        for meta in self.manifest["sheets"]:
+            df = _read_frame(os.path.join(self.path, meta["file"]), meta)
+            spec = specs.get(meta["name"])
+            sheets[meta["name"]] = spec.apply(df) if spec else df
+        return sheets
+
+    def size(self):
+        # Bytes of its Parquet files, about what the xlsx it came from weighs
+        return sum(os.path.getsize(os.path.join(self.path, meta["file"])) for meta in self.manifest["sheets"])
+
+    def poid_index(self):
+        return _poid_index(self.path)
+
+    def match_poid(self, poid):
+        # Same result as pld.convert.match_poid on the full sheet
+        index = self.poid_index()
+        if poid not in index.index:
+            return None
+        row = index.loc[poid]
+        return poid, row["POName"], row["Keyword"]
+
+    def describe(self):
+        return f"{self.source} (version {self.version[:12]}, imported {self.imported_at})"
+
+
+@lru_cache(maxsize=8)
+def _poid_index(path):
+    with open(os.path.join(path, "manifest.json")) as f:
+        meta = json.load(f)["poid_index"]
+    return _read_frame(os.path.join(path, "poid_index.parquet"), meta).set_index("POID")
+
+
+def _kind_dir(kind, store):
+    if kind not in KINDS:
+        raise ValueError(f"Unknown reference kind '{kind}', expected one of: {', '.join(KINDS)}")
+    return os.path.join(store or DEFAULT_STORE, kind)
+
+
+def _open(path):
+    with open(os.path.join(path, "manifest.json")) as f:
+        return Reference(path, json.load(f))
+
+
+def _current_version(kind_dir):
+    try:
+        with open(os.path.join(kind_dir, "CURRENT")) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def current_reference(kind, store=None):
+    # The CURRENT version of a kind, or None before the first import
+    kind_dir = _kind_dir(kind, store)
+    version = _current_version(kind_dir)
+    try:
+        return _open(os.path.join(kind_dir, version)) if version else None
+    except FileNotFoundError:
+        return None
+
+
+def import_reference(kind, upload, source="", digest=None, store=None, engine=None):
+    # Parse an uploaded reference workbook into a new version and make it CURRENT.
+    # Returns the Reference; a workbook that is already stored is not parsed again.
+    kind_dir = _kind_dir(kind, store)
+    data = upload.getvalue() if hasattr(upload, "getvalue") else upload
+    if digest is None:
+        digest = content_digest(data)
+    version_dir = os.path.join(kind_dir, digest[:16])
+
+    if not os.path.exists(os.path.join(version_dir, "manifest.json")):
+        sheets = load_sheets(data, KINDS[kind], digest=digest, engine=engine, specs=read_specs(kind))
+        # A workbook the conversion cannot use never becomes a stored version
+        check({kind: sheets})
+
+        os.makedirs(kind_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=kind_dir, prefix=".import-")
+        try:
+            manifest = {
+                "format": FORMAT,
+                "kind": kind,
+                "version": digest,
+                "source": source,
+                "imported_at": datetime.datetime.now().isoformat(timespec="seconds"),
+                "sheets": [],
+            }
+            for i, (name, df) in enumerate(sheets.items()):
+                meta = _write_frame(df, os.path.join(staging, f"sheet{i}.parquet"))
+                manifest["sheets"].append({"name": name, "file": f"sheet{i}.parquet", **meta})
+            if kind == "poid":
+                index = sheets["Sheet1"][["POID", "POName", "Keyword"]].drop_duplicates("POID")
+                manifest["poid_index"] = _write_frame(index, os.path.join(staging, "poid_index.parquet"))
+            with open(os.path.join(staging, "manifest.json"), "w") as f:
+                json.dump(manifest, f, indent=2, default=str)
+            try:
+                os.rename(staging, version_dir)
+            except OSError:
+                # Imported concurrently by another session
+                shutil.rmtree(staging, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+    if _current_version(kind_dir) == os.path.basename(version_dir):
+        return _open(version_dir)
+    with _lock:
+        current = os.path.join(kind_dir, ".CURRENT.tmp")
+        with open(current, "w") as f:
+            f.write(os.path.basename(version_dir))
+        os.replace(current, os.path.join(kind_dir, "CURRENT"))
+        _prune(kind_dir, keep=os.path.basename(version_dir))
+    return _open(version_dir)
+
+
+def _prune(kind_dir, keep):
+    versions = []
+    for name in os.listdir(kind_dir):
+        manifest = os.path.join(kind_dir, name, "manifest.json")
+        if name != keep and os.path.exists(manifest):
+            versions.append((os.path.getmtime(manifest), name))
+    for _, name in sorted(versions, reverse=True)[KEEP_VERSIONS - 1 :]:
+        shutil.rmtree(os.path.join(kind_dir, name), ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m pld.refstore", description="Reference data store for PLD conversions.")
+    parser.add_argument("--store", default=DEFAULT_STORE, help="store directory (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    imports = commands.add_parser("import", help="import reference workbooks and make them current")
+    imports.add_argument("--poid", help="POID matching file (Roaming_SC_Completion_v1.xlsx)")
+    imports.add_argument("--prodef", help="Prodef DMP file")
+    commands.add_parser("show", help="list the current reference versions")
+    args = parser.parse_args(argv)
+
+    if args.command == "import":
+        files = {"poid": args.poid, "prodef": args.prodef}
+        if not any(files.values()):
+            parser.error("nothing to import, give --poid and/or --prodef")
+        for kind, path in files.items():
+            if path:
+                with open(path, "rb") as f:
+                    reference = import_reference(kind, f.read(), source=os.path.basename(path), store=args.store)
+                print(f"{kind:<7} {reference.describe()}")
+        return 0
+
+    for kind in KINDS:
+        reference = current_reference(kind, args.store)
+        print(f"{kind:<7} {reference.describe() if reference else 'not imported'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
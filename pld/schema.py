@@ -0,0 +1,288 @@
+# Declarative schema of the input workbooks, checked before any transform runs.
+#
+# Every sheet the conversion reads is listed with the columns it uses and their expected
+# type. validate() compares a workbook's sheets against it and returns every violation at
+# once instead of the first KeyError halfway through the pipeline. read_headers() gives it
+# the header row plus the first SAMPLE_ROWS rows of each sheet, so checking an upload
+# costs a fraction of parsing it.
+#
+#   error:   the conversion would fail (missing sheet or required column)
+#   warning: the conversion runs, but the PLD loses something (a sheet left out, a
+#            column left out or defaulted, values that normalize to blank or 0)
+# Sheets of transforms that report their own errors (on_error="report", the Prodef
+# Rules-Price lookup) are left out of the PLD rather than stopping it, so their
+# violations are warnings.
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from pld.loader import ReadSpec, load_sheets
+from pld.sheets import TRANSFORMS
+
+# Expected column types; "text" accepts anything, "integer" and "number" accept blanks,
+# numbers and numeric text ("number" also with thousands separators: "1,000")
+TYPES = ("text", "integer", "number")
+SAMPLE_ROWS = 200
+
+
+@dataclass
+class InputSheet:
+    # One sheet of an input workbook ("igbot", "prodef" or "poid")
+    #   columns:  column -> expected type, for the columns the conversion reads
+    #   required: columns whose absence stops the conversion
+    #   level:    level of the violations of this sheet ("error" or "warning")
+    #   read:     ReadSpec the sheet is loaded with (columns kept, compact dtypes)
+    workbook: str
+    sheet: str
+    columns: dict = field(default_factory=dict)
+    required: tuple = ()
+    level: str = "error"
+    read: ReadSpec = None
+
+
+@dataclass
+class Violation:
+    level: str
+    workbook: str
+    sheet: str
+    message: str
+
+    def __str__(self):
+        return f"{WORKBOOK_LABELS[self.workbook]} '{self.sheet}': {self.message}"
+
+
+class SchemaError(ValueError):
+    # Raised with every violation of the inputs when at least one is an error
+    def __init__(self, violations):
+        self.violations = violations
+        super().__init__("; ".join(f"{v.level}: {v}" for v in violations))
+
+
+WORKBOOK_LABELS = {"igbot": "iGBot file", "prodef": "Prodef DMP", "poid": "POID matching file"}
+
+SCHEMA = [
+    InputSheet(
+        "igbot",
+        "Rules-Keyword",
+        columns={"Keyword": "text", "Ruleset ShortName": "text", "Short Code": "text"},
+        read=ReadSpec(dtypes={"Short Code": "category"}),
+    ),
+    InputSheet(
+        "igbot",
+        "Rules-Alias",
+        columns={"Alias": "text", "Short Code": "text"},
+        read=ReadSpec(dtypes={"Short Code": "category"}),
+    ),
+    InputSheet(
+        "igbot",
+        "Rules-Header",
+        columns={"Ruleset ShortName": "text", "Keyword": "text", "Ruleset Version": "integer"},
+        required=("Keyword",),
+        read=ReadSpec(dtypes={"Keyword": "category"}),
+    ),
+    InputSheet(
+        "igbot",
+        "PCRF",
+        columns={"Ruleset ShortName": "text", "LifeTime Validity": "text", "MaxLife Time": "text"},
+        required=("Ruleset ShortName",),
+        read=ReadSpec(dtypes={"LifeTime Validity": "category", "MaxLife Time": "category"}),
+    ),
+    InputSheet(
+        "igbot",
+        "Rules-Cases-Condition",
+        columns={"Ruleset ShortName": "text", "OpIndex": "integer"},
+        level="warning",
+        # Keyword Type is blanked by the transform
+        read=ReadSpec(dtypes={"OpIndex": "Int64", "Keyword Type": "category"}),
+    ),
+    InputSheet(
+        "igbot",
+        "Rules-Cases-Success",
+        columns={"Ruleset ShortName": "text", "OpIndex": "integer"},
+        level="warning",
+        read=ReadSpec(dtypes={"OpIndex": "Int64"}),
+    ),
+    InputSheet(
+        "igbot",
+        "Rules-Price-Mapping",
+        columns={"PO ID": "text", "SID": "text", "Variable Name": "text", "Resultant Shortname": "text"},
+        read=ReadSpec(dtypes={"PO ID": "category", "Variable Name": "category"}),
+    ),
+    InputSheet(
+        "igbot",
+        "Rules-Renewal",
+        columns={
+            "Ruleset ShortName": "text",
+            "Max Cycle": "integer",
+            "Period": "integer",
+            "Amount": "number",
+            "Reg Subaction": "text",
+            "Flag Charge": "text",
+            "Flag Suspend": "text",
+            "Flag Option": "text",
+        },
+        required=("Max Cycle", "Period", "Flag Charge", "Flag Suspend", "Flag Option"),
+        read=ReadSpec(
+            dtypes={
+                "Max Cycle": "Int64",
+                "Period": "Int64",
+                "Reg Subaction": "category",
+                "Flag Charge": "category",
+                "Flag Suspend": "category",
+                "Flag Option": "category",
+            }
+        ),
+    ),
+    InputSheet(
+        "igbot",
+        "Library-Addon-Name",
+        columns={
+            "Ruleset ShortName": "text",
+            "Master Shortcode": "text",
+            "Active Period Length": "text",
+            "Grace Period": "text",
+        },
+        read=ReadSpec(
+            dtypes={"Master Shortcode": "category", "Active Period Length": "category", "Grace Period": "category"}
+        ),
+    ),
+    InputSheet(
+        "prodef",
+        "Rules-Messages",
+        columns={"Ruleset ShortName": "text"},
+        required=("Ruleset ShortName",),
+    ),
+    InputSheet(
+        "prodef",
+        "Rules-Price",
+        columns={"SID": "text", "Variable Name": "text", "Resultant Shortname": "text"},
+        required=("Variable Name",),
+        level="warning",
+        read=ReadSpec(dtypes={"Variable Name": "category"}),
+    ),
+    InputSheet(
+        "prodef",
+        "Rebuy-Association",
+        columns={"Rebuy Option": "text", "Source Ruleset ShortName": "text", "Source MPP": "text"},
+        required=("Rebuy Option", "Source Ruleset ShortName", "Source MPP"),
+        read=ReadSpec(dtypes={"Rebuy Option": "category", "Service Type": "category"}),
+    ),
+    InputSheet(
+        "prodef",
+        "Library-Addon-DA",
+        columns={"Ruleset ShortName": "text", "DA ID": "text", "Initial Value": "number"},
+        required=("DA ID",),
+    ),
+    InputSheet(
+        "prodef",
+        "Standalone",
+        columns={"Ruleset ShortName": "text", "Value": "text", "UOM": "text", "Validity": "text", "ID": "text"},
+        required=("Ruleset ShortName", "Value", "UOM", "Validity", "ID"),
+        read=ReadSpec(dtypes={"UOM": "category"}),
+    ),
+    InputSheet("prodef", "UMB-Push-Category", columns={"Ruleset ShortName": "text"}),
+    InputSheet(
+        "poid",
+        "Sheet1",
+        columns={"POID": "text", "POName": "text", "Keyword": "text"},
+        required=("POID", "POName", "Keyword"),
+        # Only the POID lookup reads this sheet
+        read=ReadSpec(usecols=("POID", "POName", "Keyword")),
+    ),
+]
+
+
+def schema_sheets(workbook):
+    return [s.sheet for s in SCHEMA if s.workbook == workbook]
+
+
+def read_specs(workbook):
+    # Sheet name -> ReadSpec, for load_sheets(specs=...)
+    return {s.sheet: s.read for s in SCHEMA if s.workbook == workbook and s.read is not None}
+
+
+def _check_registry():
+    # Every sheet a transform reads needs a schema entry, and every column a transform
+    # requires must be required here too
+    declared = {(s.workbook, s.sheet): s for s in SCHEMA}
+    for t in TRANSFORMS:
+        for source in t.inputs:
+            if source not in declared:
+                raise ValueError(f"'{t.name}' reads {source}, which has no schema entry")
+        if t.source and not set(t.required) <= set(declared[t.source].required):
+            raise ValueError(f"'{t.name}' requires columns the schema of {t.source} does not")
+    for s in SCHEMA:
+        unknown = {col: kind for col, kind in s.columns.items() if kind not in TYPES}
+        if unknown or not set(s.required) <= set(s.columns):
+            raise ValueError(f"Invalid schema entry for {s.workbook} '{s.sheet}'")
+
+
+_check_registry()
+
+
+def read_headers(upload, workbook, digest=None, engine=None):
+    # Header row and first SAMPLE_ROWS rows of each sheet of the schema, uncached
+    return load_sheets(
+        upload, schema_sheets(workbook), digest=digest, cache=None, engine=engine, nrows=SAMPLE_ROWS
+    )
+
+
+def _numeric(s, thousands):
+    text = s.astype(str).str.strip()
+    if thousands:
+        text = text.str.replace(",", "", regex=False)
+    return pd.to_numeric(text, errors="coerce")
+
+
+def _bad_values(s, kind):
+    # Non-blank values of s that are not numbers (they normalize to blank or 0), and
+    # fractions in an integer column (the Int64 cast fails on them)
+    if kind == "text":
+        return s.iloc[:0], s.iloc[:0]
+    s = s.dropna()
+    s = s[s.astype(str).str.strip() != ""]
+    values = _numeric(s, thousands=kind == "number")
+    if kind != "integer":
+        return s[values.isna()], s.iloc[:0]
+    return s[values.isna()], s[values.notna() & (values % 1 != 0)]
+
+
+def validate(workbook, sheets):
+    # Violations of one workbook's sheets (full frames or read_headers samples), in
+    # schema order
+    violations = []
+    for spec in SCHEMA:
+        if spec.workbook != workbook:
+            continue
+
+        def report(level, message):
+            violations.append(Violation(level, workbook, spec.sheet, message))
+
+        if spec.sheet not in sheets:
+            report(spec.level, "sheet is missing")
+            continue
+        df = sheets[spec.sheet]
+        for col, kind in spec.columns.items():
+            if col not in df.columns:
+                report(spec.level if col in spec.required else "warning", f"column '{col}' is missing")
+                continue
+            not_numbers, fractions = _bad_values(df[col].head(SAMPLE_ROWS), kind)
+            for level, bad in (("warning", not_numbers), (spec.level, fractions)):
+                if len(bad):
+                    # Row numbers as shown in Excel, below the header row
+                    rows = ", ".join(str(i + 2) for i in bad.index[:3])
+                    report(
+                        level,
+                        f"column '{col}' expects {kind} values, found {bad.iloc[0]!r} "
+                        f"(row{'s' if len(bad) > 1 else ''} {rows})",
+                    )
+    return violations
+
+
+def check(workbooks):
+    # Validate {workbook: sheets} together. Raises SchemaError with every violation when
+    # any of them is an error, otherwise returns the warnings
+    violations = [v for workbook, sheets in workbooks.items() for v in validate(workbook, sheets)]
+    if any(v.level == "error" for v in violations):
+        raise SchemaError(violations)
+    return violations
@@ -0,0 +1,481 @@
+# Local HTTP API for PLD conversions, for automation that should not drive the page:
+#
+#   python -m pld.service serve --port 8765 --workers 2 --queue 16
+#   python -m pld.service convert iGBot-Result-Roaming-RSC00001.xlsx --id 77 --url http://127.0.0.1:8765
+#
+#   POST   /jobs               multipart/form-data: igbot (file, named like the iGBot result
+#                              file so the POID can be read from it), id, optionally format
+#                              (xlsx, csv, parquet), poid, prodef and previous (files)
+#                              -> 202 with the job status; 503 when the queue is full
+#   GET    /jobs               status of every job kept
+#   GET    /jobs/<job>         status: queued (with its queue position), running, done, failed
+#   GET    /jobs/<job>/result  the PLD once done (409 before); /changes for the changes-only PLD
+#   DELETE /jobs/<job>         forget a finished job and its files
+#   GET    /health             workers, queue and cache counters
+#
+# Jobs wait in a bounded queue and run on a fixed number of worker threads, one
+# conversion per worker (pld.batch.convert_file, the same validation and summary row as
+# the batch CLI). The worker threads share this process' reference store, parse cache
+# and the Prodef sheets of each stored version, so the POID and Prodef files only have
+# to be sent when they change: without them the stored versions are used, and a file
+# that is already stored is not parsed again. Results are kept on disk until the job is
+# deleted or one of the oldest KEEP_JOBS finished jobs.
+import argparse
+import email.parser
+import email.policy
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import OrderedDict, deque
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from queue import Full, Queue
+
+from pld.batch import convert_file
+from pld.cache import parse_cache
+from pld.convert import FORMATS, extract_poid, pld_file_name
+from pld.loader import Sheets
+from pld.refstore import DEFAULT_STORE, current_reference, import_reference
+
+DEFAULT_PORT = 8765
+KEEP_JOBS = 100
+MAX_UPLOAD_BYTES = 200 * 1024 * 1024
+# Prodef versions whose sheets stay loaded
+PRODEF_VERSIONS = 2
+
+
+class Job:
+    def __init__(self, file, pld_id, format, uploads):
+        self.id = uuid.uuid4().hex[:12]
+        self.file = file
+        self.pld_id = pld_id
+        self.format = format
+        self.uploads = uploads  # form field -> (file name, bytes), dropped once the job starts
+        self.status = "queued"
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.row = None  # pld.batch summary row
+        self.dir = None
+
+    def to_dict(self, position=None):
+        row = self.row or {}
+        return {
+            "id": self.id,
+            "status": self.status,
+            "position": position,
+            "file": self.file,
+            "pld_id": self.pld_id,
+            "format": self.format,
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished,
+            "seconds": row.get("seconds"),
+            "output": os.path.basename(row["output"]) if row.get("output") else None,
+            "changes": os.path.basename(row["changes"]) if row.get("changes") else None,
+            "dangling": row.get("dangling"),
+            "messages": row.get("messages", ""),
+        }
+
+
+class ConversionService:
+    def __init__(self, store=None, workers=2, queue_size=16, work_dir=None, engine=None):
+        self.store = store or DEFAULT_STORE
+        self.engine = engine
+        self.work_dir = work_dir or tempfile.mkdtemp(prefix="pld-service-")
+        self.queue = Queue(maxsize=queue_size)
+        self.jobs = OrderedDict()
+        self._queued = deque()
+        self._lock = threading.Lock()
+        self._prodef = OrderedDict()  # Prodef version -> Sheets
+        self._prodef_lock = threading.Lock()
+        self.workers = [
+            threading.Thread(target=self._work, daemon=True, name=f"pld-worker-{i}") for i in range(workers)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def submit(self, file, pld_id, format="xlsx", uploads=None):
+        # Queue a conversion; raises queue.Full when the queue is at capacity
+        job = Job(file, pld_id, format, uploads or {})
+        with self._lock:
+            self.queue.put_nowait(job)
+            self.jobs[job.id] = job
+            self._queued.append(job.id)
+            self._prune()
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def statuses(self):
+        with self._lock:
+            jobs = list(self.jobs.values())
+        return [self.status(job) for job in jobs]
+
+    def status(self, job):
+        with self._lock:
+            position = self._queued.index(job.id) + 1 if job.status == "queued" else None
+        return job.to_dict(position)
+
+    def delete(self, job):
+        # Finished jobs only; a queued or running job keeps its files until it is done
+        with self._lock:
+            if job.status not in ("done", "failed"):
+                return False
+            self.jobs.pop(job.id, None)
+        self._remove(job)
+        return True
+
+    def health(self):
+        with self._lock:
+            statuses = [job.status for job in self.jobs.values()]
+        return {
+            "workers": len(self.workers),
+            "queued": statuses.count("queued"),
+            "running": statuses.count("running"),
+            "queue_size": self.queue.maxsize,
+            "jobs": len(statuses),
+            "prodef_versions": list(self._prodef),
+            "parse_cache": parse_cache.stats(),
+        }
+
+    def shutdown(self):
+        for _ in self.workers:
+            self.queue.put(None)
+        for worker in self.workers:
+            worker.join()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def _prune(self):
+        finished = [job for job in self.jobs.values() if job.status in ("done", "failed")]
+        for job in finished[: max(0, len(finished) - KEEP_JOBS)]:
+            del self.jobs[job.id]
+            self._remove(job)
+
+    def _remove(self, job):
+        if job.dir:
+            shutil.rmtree(job.dir, ignore_errors=True)
+
+    def _prodef_sheets(self, reference):
+        # Loaded once per stored version and shared by every job (convert_file copies them)
+        if reference is None:
+            return Sheets()
+        with self._prodef_lock:
+            if reference.version not in self._prodef:
+                self._prodef[reference.version] = reference.sheets()
+                while len(self._prodef) > PRODEF_VERSIONS:
+                    self._prodef.popitem(last=False)
+            self._prodef.move_to_end(reference.version)
+            return self._prodef[reference.version]
+
+    def _reference(self, kind, upload):
+        if upload is None:
+            return current_reference(kind, self.store)
+        name, data = upload
+        return import_reference(kind, data, source=name, store=self.store, engine=self.engine)
+
+    def _work(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            with self._lock:
+                self._queued.remove(job.id)
+                job.status = "running"
+                job.started = time.time()
+            try:
+                job.row = self._run(job)
+                status = "failed" if job.row["status"] == "failed" else "done"
+            except Exception as e:
+                job.row = {"status": "failed", "messages": f"{type(e).__name__}: {e}"}
+                status = "failed"
+            with self._lock:
+                job.uploads = {}
+                job.status = status
+                job.finished = time.time()
+
+    def _run(self, job):
+        job.dir = os.path.join(self.work_dir, job.id)
+        os.makedirs(job.dir)
+        poid_ref = self._reference("poid", job.uploads.get("poid"))
+        if poid_ref is None:
+            raise ValueError("No POID matching file uploaded and none in the reference store.")
+        prodef_sheets = self._prodef_sheets(self._reference("prodef", job.uploads.get("prodef")))
+
+        path = os.path.join(job.dir, os.path.basename(job.file))
+        with open(path, "wb") as f:
+            f.write(job.uploads["igbot"][1])
+        previous_dir = None
+        poid = extract_poid(os.path.basename(job.file))
+        if "previous" in job.uploads and poid:
+            # convert_file looks the previous PLD up by its file name
+            previous_dir = os.path.join(job.dir, "previous")
+            os.makedirs(previous_dir)
+            with open(os.path.join(previous_dir, pld_file_name(job.pld_id, poid)), "wb") as f:
+                f.write(job.uploads["previous"][1])
+        return convert_file(
+            path,
+            {},
+            job.pld_id,
+            job.dir,
+            engine=self.engine,
+            previous_dir=previous_dir,
+            poid_ref=poid_ref,
+            prodef_sheets=prodef_sheets,
+            format=job.format,
+        )
+
+
+def parse_form(content_type, body):
+    # multipart/form-data body -> (fields {name: text}, files {name: (file name, bytes)})
+    message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode() + body
+    )
+    if not message.is_multipart():
+        raise ValueError("expected a multipart/form-data body")
+    fields, files = {}, {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        data = part.get_payload(decode=True) or b""
+        if part.get_filename() is not None:
+            files[name] = (part.get_filename(), data)
+        else:
+            fields[name] = data.decode().strip()
+    return fields, files
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "pld-service"
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def log_message(self, format, *args):
+        # Access log on stderr, like the conversion logs
+        sys.stderr.write(f"{self.address_string()} {format % args}\n")
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status, message, headers=None):
+        self._send_json(status, {"error": message}, headers)
+
+    def _job(self, parts):
+        job = self.service.get(parts[1]) if len(parts) > 1 else None
+        if job is None:
+            self._error(HTTPStatus.NOT_FOUND, "no such job")
+        return job
+
+    def _send_file(self, path, file_name, mime):
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", mime)
+        self.send_header("Content-Length", str(os.path.getsize(path)))
+        self.send_header("Content-Disposition", f'attachment; filename="{file_name}"')
+        self.end_headers()
+        with open(path, "rb") as f:
+            shutil.copyfileobj(f, self.wfile)
+
+    def do_GET(self):
+        parts = self.path.strip("/").split("/")
+        if parts == ["health"]:
+            return self._send_json(HTTPStatus.OK, self.service.health())
+        if parts == ["jobs"]:
+            return self._send_json(HTTPStatus.OK, self.service.statuses())
+        if parts[0] != "jobs" or len(parts) > 3:
+            return self._error(HTTPStatus.NOT_FOUND, "unknown path")
+        job = self._job(parts)
+        if job is None:
+            return
+        status = self.service.status(job)
+        if len(parts) == 2:
+            return self._send_json(HTTPStatus.OK, status)
+        if parts[2] not in ("result", "changes"):
+            return self._error(HTTPStatus.NOT_FOUND, "unknown path")
+        if job.status != "done":
+            return self._send_json(HTTPStatus.CONFLICT, status)
+        path = job.row["output" if parts[2] == "result" else "changes"]
+        if not path:
+            return self._error(HTTPStatus.NOT_FOUND, "this job has no changes-only PLD")
+        self._send_file(path, os.path.basename(path), FORMATS[job.format][1])
+
+    def do_POST(self):
+        if self.path.strip("/") != "jobs":
+            return self._error(HTTPStatus.NOT_FOUND, "unknown path")
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_UPLOAD_BYTES:
+            return self._error(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"uploads are limited to {MAX_UPLOAD_BYTES} bytes")
+        try:
+            fields, files = parse_form(self.headers.get("Content-Type", ""), self.rfile.read(length))
+        except ValueError as e:
+            return self._error(HTTPStatus.BAD_REQUEST, str(e))
+        format = fields.get("format") or "xlsx"
+        if "igbot" not in files or not fields.get("id"):
+            return self._error(HTTPStatus.BAD_REQUEST, "an igbot file and an id are required")
+        if format not in FORMATS:
+            return self._error(HTTPStatus.BAD_REQUEST, f"format must be one of {', '.join(FORMATS)}")
+        try:
+            job = self.service.submit(files["igbot"][0], fields["id"], format, files)
+        except Full:
+            return self._error(HTTPStatus.SERVICE_UNAVAILABLE, "the job queue is full", {"Retry-After": "5"})
+        self._send_json(HTTPStatus.ACCEPTED, self.service.status(job), {"Location": f"/jobs/{job.id}"})
+
+    def do_DELETE(self):
+        parts = self.path.strip("/").split("/")
+        if parts[0] != "jobs" or len(parts) != 2:
+            return self._error(HTTPStatus.NOT_FOUND, "unknown path")
+        job = self._job(parts)
+        if job is None:
+            return
+        if not self.service.delete(job):
+            return self._send_json(HTTPStatus.CONFLICT, self.service.status(job))
+        self.send_response(HTTPStatus.NO_CONTENT)
+        self.end_headers()
+
+
+def make_server(host="127.0.0.1", port=DEFAULT_PORT, **service_args):
+    # The server and its service; port=0 picks a free port (server.server_address)
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.service = ConversionService(**service_args)
+    return server
+
+
+# Client side, for automation and for trying the service out locally
+
+
+def _form(fields, files):
+    boundary = uuid.uuid4().hex
+    chunks = []
+    for name, value in fields.items():
+        chunks.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, path in files.items():
+        with open(path, "rb") as f:
+            data = f.read()
+        chunks.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{os.path.basename(path)}"\r\n'
+            f"Content-Type: application/octet-stream\r\n\r\n".encode()
+            + data
+            + b"\r\n"
+        )
+    chunks.append(f"--{boundary}--\r\n".encode())
+    return b"".join(chunks), f"multipart/form-data; boundary={boundary}"
+
+
+def _request(url, method="GET", data=None, content_type=None):
+    request = urllib.request.Request(url, data=data, method=method)
+    if content_type:
+        request.add_header("Content-Type", content_type)
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+def submit(url, igbot, pld_id, format="xlsx", poid=None, prodef=None, previous=None):
+    # Status of the new job; raises RuntimeError when the service refuses it
+    files = {"igbot": igbot, "poid": poid, "prodef": prodef, "previous": previous}
+    files = {name: path for name, path in files.items() if path}
+    body, content_type = _form({"id": pld_id, "format": format}, files)
+    status, data = _request(f"{url}/jobs", "POST", body, content_type)
+    if status != HTTPStatus.ACCEPTED:
+        raise RuntimeError(f"{status}: {json.loads(data)['error']}")
+    return json.loads(data)
+
+
+def job_status(url, job_id):
+    return json.loads(_request(f"{url}/jobs/{job_id}")[1])
+
+
+def wait(url, job_id, interval=0.5, timeout=None):
+    # Poll until the job is done or failed; returns its last status
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        status = job_status(url, job_id)
+        if status["status"] in ("done", "failed"):
+            return status
+        if deadline is not None and time.monotonic() > deadline:
+            raise TimeoutError(f"job {job_id} is still {status['status']}")
+        time.sleep(interval)
+
+
+def download(url, job_id, path, part="result"):
+    status, data = _request(f"{url}/jobs/{job_id}/{part}")
+    if status != HTTPStatus.OK:
+        raise RuntimeError(f"{status}: {data.decode()}")
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m pld.service", description="Local HTTP API for PLD conversions.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="run the service")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve.add_argument("--workers", type=int, default=2, help="conversions run at once")
+    serve.add_argument("--queue", type=int, default=16, help="jobs waiting at most")
+    serve.add_argument("--store", default=DEFAULT_STORE, help="reference store directory (default: %(default)s)")
+    client = commands.add_parser("convert", help="convert iGBot files through a running service")
+    client.add_argument("inputs", nargs="+", help="iGBot result files")
+    client.add_argument("--id", required=True, help="PLD ID")
+    client.add_argument("--url", default=f"http://127.0.0.1:{DEFAULT_PORT}")
+    client.add_argument("--format", choices=tuple(FORMATS), default="xlsx")
+    client.add_argument("--poid-file", help="POID matching file; default: the one stored by the service")
+    client.add_argument("--prodef-file", help="Prodef DMP file; default: the one stored by the service")
+    client.add_argument("--out-dir", default=".", help="directory for the PLD files")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        server = make_server(
+            args.host, args.port, store=args.store, workers=max(1, args.workers), queue_size=args.queue
+        )
+        print(f"Serving PLD conversions on http://{args.host}:{server.server_address[1]}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            server.service.shutdown()
+        return 0
+
+    url = args.url.rstrip("/")
+    # Every file is queued first, so the service converts them concurrently. The reference
+    # files go with each job, as any of them may start first; the service parses them once
+    jobs = [
+        (path, submit(url, path, args.id, args.format, poid=args.poid_file, prodef=args.prodef_file))
+        for path in args.inputs
+    ]
+    os.makedirs(args.out_dir, exist_ok=True)
+    failed = 0
+    for path, job in jobs:
+        status = wait(url, job["id"])
+        if status["status"] == "done":
+            output = download(url, job["id"], os.path.join(args.out_dir, status["output"]))
+            print(f"done     {status['seconds']:>7.2f}s  {os.path.basename(path)} -> {output}")
+        else:
+            failed += 1
+            print(f"failed   {os.path.basename(path)}: {status['messages']}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,341 @@
+# Sheet registry of the PLD workbook, in output order
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from pld.normalize import (
+    as_str,
+    clean_str,
+    exit_value,
+    int_str,
+    lower_str,
+    strip_str,
+    thousands_int,
+    to_int64,
+    upper_str,
+    version_int,
+)
+from pld.pipeline import SheetTransform
+from pld.writer import SheetTemplate
+
+
+def static(columns):
+    # Placeholder sheet: one "sample" row with Action NO_CHANGE, built once at import
+    return SheetTemplate([*columns, "Action"], [["sample"] * len(columns) + ["NO_CHANGE"]])
+
+
+def build_po(df, ctx):
+    # PO sheet with predefined and matched values
+    return pd.DataFrame(
+        {
+            "PO ID": [ctx.poid],  # Matched POID from file2
+            "PO Name": [ctx.po_name],  # Retrieved from file2
+            "Master Keyword": [ctx.master_keyword],  # Retrieved from file2
+            "Family": ["roamingSingleCountry"],  # Predefined value
+            "PO Type": ["ADDON"],  # Predefined value
+            "Product Category": ["b2cMobile"],  # Predefined value
+            "Payment Type": ["Prepaid,Postpaid"],  # Predefined value
+            "Action": ["NO_CHANGE"],  # Predefined value
+        }
+    )
+
+
+def build_rules_header(df, ctx):
+    df["Action"] = np.where(df["Keyword"] == "AKTIF", "INSERT", "NO_CHANGE")
+    return df
+
+
+def build_rules_cases_condition(df, ctx):
+    df["Action"] = "INSERT"
+    # Replace the whole column: an all-blank column is read as float64, and setting ""
+    # into it through .loc is deprecated in pandas
+    df["Keyword Type"] = ""
+    return df
+
+
+def build_rules_cases_success(df, ctx):
+    if "Ruleset ShortName" in df.columns:
+        df["Exit Value"] = exit_value(df["Ruleset ShortName"])
+    df["Action"] = "INSERT"
+    return df
+
+
+def build_rules_price_mapping(df, ctx):
+    # Append the "dormant" rows of the Prodef DMP Rules-Price sheet
+    try:
+        prodef_df = ctx.input("prodef", "Rules-Price")
+
+        if "Variable Name" not in prodef_df.columns:
+            ctx.error("'Rules-Price' sheet in Prodef DMP is missing the 'Variable Name' column.")
+            return df
+
+        prodef_df["Variable Name"] = prodef_df["Variable Name"].astype(str).str.strip().str.lower()
+        dormant_df = prodef_df[prodef_df["Variable Name"] == "dormant"].copy()
+        if dormant_df.empty:
+            ctx.warning("No 'dormant' rows found in 'Rules-Price'.")
+            return df
+
+        dormant_df["PO ID"] = ctx.poid
+        for col in ["SID", "Variable Name", "Resultant Shortname", "Action"]:
+            if col not in dormant_df.columns:
+                dormant_df[col] = ""
+        dormant_df["Action"] = "INSERT"
+
+        return pd.concat([df, dormant_df], ignore_index=True, sort=False)
+    except Exception as e:
+        ctx.error(f"Error processing 'Rules-Price' sheet in Prodef DMP file: {e}")
+        return df
+
+
+def build_rebuy_association(df, ctx):
+    df["Service Type"] = "NA"
+    return df
+
+
+TRANSFORMS = [
+    SheetTransform("PO", build=build_po),
+    SheetTransform(
+        "Rules-Keyword",
+        source=("igbot", "Rules-Keyword"),
+        normalize={"Short Code": clean_str},
+        defaults={"Short Code": ""},
+        action="NO_CHANGE",
+        key=("Keyword",),
+        references={"Ruleset ShortName": "ruleset"},
+    ),
+    SheetTransform(
+        "Rules-Alias",
+        source=("igbot", "Rules-Alias"),
+        normalize={"Short Code": clean_str},
+        defaults={"Short Code": ""},
+        action="NO_CHANGE",
+        key=("Alias",),
+    ),
+    SheetTransform(
+        "Rules-Header",
+        source=("igbot", "Rules-Header"),
+        normalize={"Ruleset Version": version_int},
+        defaults={"Ruleset Version": 0},
+        build=build_rules_header,
+        key=("Ruleset ShortName",),
+    ),
+    SheetTransform(
+        "PCRF",
+        source=("igbot", "PCRF"),
+        normalize={
+            "Ruleset ShortName": strip_str,
+            "LifeTime Validity": clean_str,
+            "MaxLife Time": clean_str,
+        },
+        defaults={"LifeTime Validity": "", "MaxLife Time": ""},
+        required=("Ruleset ShortName",),
+        action="INSERT",
+        key=("Ruleset ShortName",),
+        references={"Ruleset ShortName": "ruleset"},
+    ),
+    SheetTransform(
+        "Rules-Cases-Condition",
+        source=("igbot", "Rules-Cases-Condition"),
+        normalize={"OpIndex": to_int64},
+        build=build_rules_cases_condition,
+        on_error="report",
+        key=("Ruleset ShortName", "OpIndex"),
+        references={"Ruleset ShortName": "ruleset"},
+    ),
+    SheetTransform(
+        "Rules-Cases-Success",
+        source=("igbot", "Rules-Cases-Success"),
+        normalize={"OpIndex": to_int64},
+        build=build_rules_cases_success,
+        on_error="report",
+        key=("Ruleset ShortName", "OpIndex"),
+        references={"Ruleset ShortName": "ruleset"},
+    ),
+    SheetTransform(
+        "Rules-Messages",
+        source=("prodef", "Rules-Messages"),
+        normalize={"Ruleset ShortName": strip_str},
+        required=("Ruleset ShortName",),
+        action="INSERT",
+        key=("Ruleset ShortName",),
+        references={"Ruleset ShortName": "ruleset"},
+    ),
+    SheetTransform(
+        "Rules-Price-Mapping",
+        source=("igbot", "Rules-Price-Mapping"),
+        extra_sources=(("prodef", "Rules-Price"),),
+        normalize={"Variable Name": lower_str, "SID": int_str},
+        defaults={"SID": ""},
+        action="INSERT",
+        build=build_rules_price_mapping,
+        key=("PO ID", "SID", "Variable Name"),
+        references={"PO ID": "poid", "Resultant Shortname": "ruleset"},
+    ),
+    SheetTransform(
+        "Rules-Renewal",
+        source=("igbot", "Rules-Renewal"),
+        normalize={
+            "Max Cycle": to_int64,
+            "Period": to_int64,
+            "Amount": thousands_int,
+            "Reg Subaction": clean_str,
+            "Flag Charge": upper_str,
+            "Flag Suspend": upper_str,
+            "Flag Option": upper_str,
+        },
+        defaults={"Amount": None, "Reg Subaction": ""},
+        required=("Max Cycle", "Period", "Flag Charge", "Flag Suspend", "Flag Option"),
+        action="INSERT",
+        key=("Ruleset ShortName",),
+        references={"Ruleset ShortName": "ruleset"},
+    ),
+    SheetTransform(
+        "Rules-GSI GRP Pack",
+        template=static(["Ruleset ShortName", "GSI GRP Pack-Group ID"]),
+    ),
+    SheetTransform(
+        "Rules-Location Group",
+        template=static(["Ruleset ShortName", "Package Group", "Microcluster ID"]),
+    ),
+    SheetTransform(
+        "Rebuy-Out",
+        template=static(
+            [
+                "Target PO ID",
+                "Target Ruleset ShortName",
+                "Target MPP",
+                "Target Group",
+                "Service Type",
+                "Rebuy Price",
+                "Allow Rebuy",
+                "Rebuy Option",
+                "Product Family",
+                "Source PO ID",
+                "Source Ruleset ShortName",
+                "Source MPP",
+                "Source Group",
+                "Vice Versa Consent",
+            ]
+        ),
+    ),
+    SheetTransform(
+        "Rebuy-Association",
+        source=("prodef", "Rebuy-Association"),
+        normalize={
+            "Rebuy Option": strip_str,
+            "Source Ruleset ShortName": upper_str,
+            "Source MPP": upper_str,
+        },
+        required=("Rebuy Option", "Source Ruleset ShortName", "Source MPP"),
+        build=build_rebuy_association,
+        # The Prodef rows' Action is passed through. Target columns are not in every Prodef
+        # DMP, so the key is the required source columns; the other cells are compared
+        key=("Source Ruleset ShortName", "Source MPP"),
+        references={"Source Ruleset ShortName": "ruleset"},
+    ),
+    SheetTransform(
+        "Incompatibility",
+        template=static(["ID", "Target PO/RulesetShortName", "Source Family", "Source PO/RulesetShortName"]),
+    ),
+    SheetTransform(
+        "Library-Addon-Name",
+        source=("igbot", "Library-Addon-Name"),
+        normalize={
+            "Master Shortcode": clean_str,
+            "Active Period Length": clean_str,
+            "Grace Period": clean_str,
+        },
+        defaults={"Master Shortcode": "", "Active Period Length": "", "Grace Period": ""},
+        action="INSERT",
+        key=("Ruleset ShortName",),
+        references={"Ruleset ShortName": "ruleset"},
+    ),
+    SheetTransform(
+        "Library-Addon-DA",
+        source=("prodef", "Library-Addon-DA"),
+        normalize={"DA ID": as_str, "Initial Value": partial(thousands_int, round_decimals=True)},
+        required=("DA ID",),
+        action="INSERT",
+        key=("Ruleset ShortName", "DA ID"),
+        references={"Ruleset ShortName": "ruleset"},
+    ),
+    SheetTransform(
+        "Library-Addon-UCUT",
+        template=static(
+            [
+                "Ruleset ShortName",
+                "PO ID",
+                "Quota Name",
+                "UCUT ID",
+                "Internal Description Bahasa",
+                "External Description Bahasa",
+                "Internal Description English",
+                "External Description English",
+                "Visibility",
+                "Custom",
+                "Initial Value",
+                "Unlimited Benefit Flag",
+            ]
+        ),
+    ),
+    SheetTransform(
+        "Standalone",
+        source=("prodef", "Standalone"),
+        normalize={
+            "Ruleset ShortName": strip_str,
+            "Value": as_str,
+            "UOM": as_str,
+            "Validity": as_str,
+            "ID": as_str,
+        },
+        required=("Ruleset ShortName", "Value", "UOM", "Validity", "ID"),
+        action="INSERT",
+        key=("Ruleset ShortName", "ID"),
+        references={"Ruleset ShortName": "ruleset"},
+    ),
+    SheetTransform(
+        "Blacklist-Gift-Promocodes",
+        template=static(["Ruleset ShortName", "Coherence Key", "Promo Codes"]),
+    ),
+    SheetTransform(
+        "Blacklist-Promocodes",
+        template=static(["PO ID", "Command/Keyword", "Promo Codes"]),
+    ),
+    SheetTransform(
+        "MYIM3-UNREG",
+        template=static(["Ruleset ShortName", "Keyword", "Shortcode", "Unreg Flag", "Buy Extra Flag"]),
+    ),
+    SheetTransform(
+        "ExtraPOConfig",
+        template=static(["Ruleset ShortName", "Extra PO Keyword"]),
+    ),
+    SheetTransform(
+        "Keyword-Global-Variable",
+        template=static(["PO ID", "Keyword", "Global Variable Type", "Value", "Keyword Type"]),
+    ),
+    SheetTransform(
+        "UMB-Push-Category",
+        source=("prodef", "UMB-Push-Category"),
+        action="INSERT",
+        key=("Ruleset ShortName",),
+        references={"Ruleset ShortName": "ruleset"},
+    ),
+    SheetTransform(
+        "Avatar-Channel",
+        template=static(["PO ID", "Ruleset ShortName", "Keyword", "Commercial Name", "Short Code", "PVR ID", "Price"]),
+    ),
+    SheetTransform(
+        "Dormant-Config",
+        template=static(["Ruleset ShortName", "Keyword", "Short Code", "Pvr"]),
+    ),
+]
+
+
+def input_sheets(workbook):
+    # Sheets the registry reads from one input workbook ("igbot" or "prodef"), in first-use order
+    return list(dict.fromkeys(sheet for t in TRANSFORMS for wb, sheet in t.inputs if wb == workbook))
+
+
+IGBOT_SHEETS = input_sheets("igbot")
+PRODEF_SHEETS = input_sheets("prodef")
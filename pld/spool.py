@@ -0,0 +1,145 @@
+# Spooled output for finished PLDs, so a large download is not kept in memory twice.
+#
+# A SpooledOutput is what convert() writes to: a BytesIO until the PLD passes
+# SPOOL_THRESHOLD bytes (PLD_SPOOL_THRESHOLD_MB, default 8), then a temp file in
+# PLD_SPOOL_DIR (default: the system temp dir) that the BytesIO content moves to. Written
+# PLDs are read without copying them first:
+#   getvalue()   the PLD as bytes: the BytesIO buffer itself, or the temp file read
+#                straight into one bytes object (through a handle closed right after)
+#   open()       a new read handle at the start, for the caller to close; handles on the
+#                temp file read it independently of each other
+#   getbuffer()  a read-only memoryview (the BytesIO buffer, or an mmap of the temp file)
+# The page hands getvalue to st.download_button as a deferred download, so the only full
+# copy in memory is the one Streamlit makes when the button is clicked.
+#
+# The temp file is deleted when the spool is closed. The page's spools are owned by the
+# process-wide workbook cache (pld/cache.py), which closes them when it evicts their
+# entry: beyond its entry count, or when the spools on disk pass PLD_SPOOL_DISK_MB. They
+# are shared by every session that converts the same inputs, so a session ending does not
+# delete them, and a rebuild of the same inputs (a profiled run) never replaces them. A
+# spool the cache does not hold is closed when it is garbage collected.
+#
+# ScratchDir is the same idea for the temp directories of multi-file batches, which are
+# kept in a session's state: removed with the next batch of the session, or when
+# Streamlit drops the state of an ended session and it is garbage collected.
+import io
+import mmap
+import os
+import shutil
+import tempfile
+import weakref
+
+SPOOL_THRESHOLD = int(float(os.environ.get("PLD_SPOOL_THRESHOLD_MB", 8)) * 1024 * 1024)
+SPOOL_DIR = os.environ.get("PLD_SPOOL_DIR") or None
+
+
+class SpooledOutput(io.IOBase):
+    def __init__(self, threshold=None, dir=None):
+        self.threshold = SPOOL_THRESHOLD if threshold is None else threshold
+        self.dir = dir or SPOOL_DIR
+        self._file = io.BytesIO()
+        self.rolled = False
+
+    def readable(self):
+        return True
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def write(self, data):
+        if not self.rolled and self._file.tell() + len(data) > self.threshold:
+            self.rollover()
+        return self._file.write(data)
+
+    def rollover(self):
+        # Move what was written so far to the temp file and keep writing there
+        if self.rolled:
+            return
+        file = tempfile.NamedTemporaryFile(dir=self.dir, prefix="pld-spool-")
+        file.write(self._file.getbuffer())
+        file.seek(self._file.tell())
+        self._file = file
+        self.rolled = True
+
+    def read(self, size=-1):
+        return self._file.read(size)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        return self._file.seek(offset, whence)
+
+    def tell(self):
+        return self._file.tell()
+
+    def truncate(self, size=None):
+        return self._file.truncate(size)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if not self.closed:
+            # IOBase.close flushes first, so the file is closed after it
+            super().close()
+            self._file.close()
+
+    @property
+    def name(self):
+        # Path of the temp file, None while in memory
+        return self._file.name if self.rolled else None
+
+    @property
+    def size(self):
+        self._file.flush()
+        return os.fstat(self._file.fileno()).st_size if self.rolled else self._file.getbuffer().nbytes
+
+    @property
+    def memory_size(self):
+        # Bytes held in memory, and below in the temp file; what the workbook cache counts
+        return 0 if self.rolled else self.size
+
+    @property
+    def disk_size(self):
+        return self.size if self.rolled else 0
+
+    def _check_open(self):
+        if self.closed:
+            raise ValueError("This PLD is no longer available (removed from the workbook cache); convert it again")
+
+    def open(self):
+        # In memory: a BytesIO over getvalue()'s bytes, which it shares rather than copies
+        self._check_open()
+        if not self.rolled:
+            return io.BytesIO(self._file.getvalue())
+        self._file.flush()
+        return open(self._file.name, "rb")
+
+    def getbuffer(self):
+        self._check_open()
+        if not self.rolled:
+            return self._file.getbuffer().toreadonly()
+        self._file.flush()
+        if self.size == 0:
+            return memoryview(b"")
+        return memoryview(mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def getvalue(self):
+        # The whole PLD as bytes (BytesIO.getvalue shares its buffer; one read from disk)
+        self._check_open()
+        if not self.rolled:
+            return self._file.getvalue()
+        with self.open() as f:
+            return f.read()
+
+
+class ScratchDir:
+    # A temp directory removed by cleanup() or when this object is garbage collected,
+    # e.g. with the session state that holds it
+    def __init__(self, prefix="pld-"):
+        self.path = tempfile.mkdtemp(prefix=prefix, dir=SPOOL_DIR)
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.path, True)
+
+    def cleanup(self):
+        self._finalizer()
@@ -0,0 +1,97 @@
+# Warm-up of a fresh server process, so the page's first render does not wait for it.
+#
+# The page renders its uploaders with nothing but Streamlit imported and calls start();
+# the first conversion then finds pandas, the Excel engines, the Parquet reader and the
+# pld modules (pld.sheets builds the static sheet templates at import) already loaded.
+# PLD_WARMUP picks what start() runs, once per process, on a daemon thread:
+#   background (default)  warm_up() below
+#   off                   nothing; everything is imported by the first conversion
+#   package.module:name   that callable instead, for deployments with their own warm-up
+#                         (it can call pld.warmup.warm_up itself)
+# Nothing here leaves the machine.
+import importlib
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger("pld.warmup")
+
+# Imported in this order; the optional engines are skipped when not installed
+MODULES = (
+    "numpy",
+    "pandas",
+    "xlsxwriter",
+    "openpyxl",
+    "python_calamine",
+    "pyarrow.parquet",
+    "pld.sheets",
+    "pld.convert",
+    "pld.refstore",
+    "pld.schema",
+    "pld.batch",
+)
+
+_lock = threading.Lock()
+_thread = None
+status = {"hook": None, "state": "not started", "seconds": None, "modules": {}}
+
+
+def warm_up():
+    # Import MODULES and resolve the reader engine; returns {module: seconds}
+    timings = {}
+    for name in MODULES:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            continue
+        timings[name] = round(time.perf_counter() - start, 4)
+    from pld.loader import resolve_engine
+
+    resolve_engine()
+    return timings
+
+
+def _hook(setting):
+    if setting == "background":
+        return warm_up
+    module, _, name = setting.partition(":")
+    if not name:
+        raise ValueError(f"PLD_WARMUP must be 'background', 'off' or 'package.module:function', not {setting!r}")
+    return getattr(importlib.import_module(module), name)
+
+
+def _run(setting):
+    start = time.perf_counter()
+    status["state"] = "running"
+    try:
+        result = _hook(setting)()
+        status["modules"] = result if isinstance(result, dict) else {}
+        status["state"] = "done"
+    except Exception as e:
+        # A failed warm-up only means the first conversion does the imports
+        status["state"] = f"failed: {type(e).__name__}: {e}"
+        logger.warning("Warm-up %s failed: %s", setting, e)
+    status["seconds"] = round(time.perf_counter() - start, 3)
+
+
+def start(setting=None):
+    # Start the configured warm-up unless it already ran in this process; never blocks
+    global _thread
+    setting = setting or os.environ.get("PLD_WARMUP", "background")
+    with _lock:
+        if _thread is not None:
+            return
+        status["hook"] = setting
+        if setting == "off":
+            status["state"] = "off"
+            return
+        _thread = threading.Thread(target=_run, args=(setting,), daemon=True, name="pld-warmup")
+        _thread.start()
+
+
+def wait(timeout=None):
+    # Block until the warm-up finished (benchmarks, tests)
+    if _thread is not None:
+        _thread.join(timeout)
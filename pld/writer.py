@@ -0,0 +1,163 @@
+# Row-streaming xlsx writer for the PLD workbook.
+#
+# DataFrame.to_excel hands xlsxwriter one cell at a time, column by column, so the whole
+# sheet has to be held as XML in memory before the zip is written. This writer emits
+# each sheet row by row through xlsxwriter's constant_memory mode: a row is flushed to a
+# temp file as soon as the next one starts, so memory no longer grows with the sheet.
+# Cells are converted the same way pandas does (header style, NaN/NA as blank cells,
+# "inf" for infinities, date formats, str() for anything else).
+import datetime
+import math
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+from pandas.api.types import infer_dtype, is_bool_dtype, is_float_dtype, is_integer_dtype, is_timedelta64_dtype
+
+# Same header look and date formats as pd.ExcelWriter(engine="xlsxwriter")
+HEADER_FORMAT = {"bold": True, "align": "center", "valign": "top", "top": 1, "right": 1, "bottom": 1, "left": 1}
+DATETIME_FORMAT = "YYYY-MM-DD HH:MM:SS"
+DATE_FORMAT = "YYYY-MM-DD"
+
+MAX_ROWS = 1048576
+MAX_COLS = 16384
+# Rows converted to Python values at a time, so only one chunk of cells is alive at once
+CHUNK_ROWS = 10_000
+
+
+class SheetTemplate:
+    # A sheet whose content never changes (the "sample" placeholder sheets). Built once
+    # at import, then written as-is by either writer.
+    def __init__(self, columns, rows):
+        self.columns = list(columns)
+        self.rows = [tuple(row) for row in rows]
+
+    def to_frame(self):
+        return pd.DataFrame(self.rows, columns=self.columns)
+
+
+def cell_value(value):
+    # The value the writer stores for one cell: pandas ExcelFormatter._format_value +
+    # ExcelWriter._value_with_fmt
+    if value is None or value is pd.NaT or value is pd.NA:
+        return None
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        if math.isnan(value):
+            return None
+        if math.isinf(value):
+            return "inf" if value > 0 else "-inf"
+        return float(value)
+    if isinstance(value, (datetime.date, datetime.timedelta)):
+        if getattr(value, "tzinfo", None) is not None:
+            raise ValueError(
+                "Excel does not support datetimes with timezones. "
+                "Please ensure that datetimes are timezone unaware before writing to Excel."
+            )
+        if isinstance(value, datetime.timedelta):
+            return value.total_seconds() / 86400
+        return value
+    if pd.api.types.is_scalar(value) and pd.isna(value):
+        return None
+    return str(value)
+
+
+def column_values(s):
+    # Python values for one column, None for blank cells
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        # One cell per category, then picked by code (code -1, a blank, picks the None)
+        cells = np.array([cell_value(v) for v in s.cat.categories] + [None], dtype=object)
+        return cells[s.cat.codes.to_numpy()].tolist()
+    if (is_bool_dtype(s.dtype) or is_integer_dtype(s.dtype)) and not s.hasnans:
+        return s.tolist()
+    if is_float_dtype(s.dtype):
+        values = s.to_numpy(dtype=float, na_value=np.nan)
+        if not np.isinf(values).any():
+            return [None if v != v else v for v in values.tolist()]
+    return [cell_value(v) for v in s.astype(object).tolist()]
+
+
+def cell_text(value):
+    # What a cell written from `value` reads back as with dtype=str (1.0 -> "1", blank -> "");
+    # the text the changes-only PLD, the reference check and the bundles compare and store
+    value = cell_value(value)
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def column_text(s):
+    # Column as cell text (numpy array), computed once per distinct value; blanks become ""
+    if s.dtype == object and infer_dtype(s, skipna=True) in ("string", "empty"):
+        # Text columns (every column of a PLD read back) are stored verbatim
+        return s.fillna("").to_numpy()
+    if is_integer_dtype(s.dtype) and not s.hasnans:
+        return s.astype(str).to_numpy()
+    codes, uniques = pd.factorize(s)
+    text = np.array([cell_text(v) for v in uniques] + [""], dtype=object)
+    return text[codes]
+
+
+class StreamingWorkbookWriter:
+    def __init__(self, output, constant_memory=True):
+        self.book = xlsxwriter.Workbook(output, {"constant_memory": constant_memory})
+        self._header = self.book.add_format(HEADER_FORMAT)
+        self._datetime = self.book.add_format({"num_format": DATETIME_FORMAT})
+        self._date = self.book.add_format({"num_format": DATE_FORMAT})
+        self._days = self.book.add_format({"num_format": "0"})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _format(self, value, timedelta_column):
+        if isinstance(value, datetime.datetime):
+            return self._datetime
+        if isinstance(value, datetime.date):
+            return self._date
+        if timedelta_column and isinstance(value, float):
+            return self._days
+        return None
+
+    def _write_body(self, ws, rows, first_row, timedelta_columns=()):
+        for r, row in enumerate(rows, start=first_row):
+            for c, value in enumerate(row):
+                if value is not None:
+                    ws.write(r, c, value, self._format(value, c in timedelta_columns))
+
+    def _add_sheet(self, sheet_name, columns):
+        ws = self.book.add_worksheet(sheet_name)
+        for c, name in enumerate(columns):
+            ws.write(0, c, cell_value(name), self._header)
+        return ws
+
+    def write_rows(self, sheet_name, columns, rows):
+        ws = self._add_sheet(sheet_name, columns)
+        self._write_body(ws, rows, 1)
+
+    def write_frame(self, sheet_name, df):
+        rows, cols = df.shape
+        if rows + 1 > MAX_ROWS or cols > MAX_COLS:
+            raise ValueError(
+                f"This sheet is too large! Your sheet size is: {rows}, {cols} "
+                f"Max sheet size is: {MAX_ROWS}, {MAX_COLS}"
+            )
+        ws = self._add_sheet(sheet_name, df.columns)
+        timedelta_columns = {i for i in range(cols) if is_timedelta64_dtype(df.iloc[:, i].dtype)}
+        for start in range(0, rows, CHUNK_ROWS):
+            chunk = df.iloc[start : start + CHUNK_ROWS]
+            columns = [column_values(chunk.iloc[:, i]) for i in range(cols)]
+            self._write_body(ws, zip(*columns), start + 1, timedelta_columns)
+
+    def write_template(self, sheet_name, template):
+        self.write_rows(sheet_name, template.columns, template.rows)
+
+    def close(self):
+        self.book.close()